@@ -2,10 +2,18 @@ from langchain.chat_models import ChatOpenAI
 from langchain.callbacks.manager import CallbackManager
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 
+from Agents.client_registry import client_registry
+
 
 class LLM:
-    def __init__(self, model_name, base_url, api_key, temperature=0,
-                 max_tokens=0, verbose=False):
+    def __init__(self, model_name=None, base_url=None, api_key=None, temperature=0,
+                 max_tokens=0, verbose=False, chat_model=None, shared_client=True):
+        """
+        :param chat_model: An already built chat model (e.g. a RecordedChatModel) used instead of creating one.
+        :param shared_client: If True, the model uses the process-wide pooled client of its base URL and credentials.
+        """
+        self.chat_model = chat_model
+        self.shared_client = shared_client
         self.model_name = model_name
         self.base_url = base_url
         self.api_key = api_key
@@ -15,6 +23,9 @@ class LLM:
         self.model = self._create_model()
 
     def _create_model(self):
+        if self.chat_model is not None:
+            return self.chat_model
+
         parameters = {
             'model_name': self.model_name,
             'base_url': self.base_url,
@@ -25,6 +36,11 @@ class LLM:
         if self.max_tokens:
             parameters['max_tokens'] = self.max_tokens
 
+        if self.shared_client:
+            pooled_client = client_registry.get(base_url=self.base_url, api_key=self.api_key)
+            parameters['client'] = pooled_client.client.chat.completions
+            parameters['async_client'] = pooled_client.async_client.chat.completions
+
         if self.verbose:
             parameters['streaming'] = self.verbose
             parameters['callback_manager'] = CallbackManager([StreamingStdOutCallbackHandler()])
@@ -1,7 +1,12 @@
+import threading
+import time
 from abc import ABC, abstractmethod
 
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 
+from Utils.metrics import llm_calls, llm_latency, llm_tokens
+from Utils.utils import count_tokens
+
 
 class Agent(ABC):
     """
@@ -16,6 +21,81 @@ class Agent(ABC):
         """
         pass
 
+    name = 'agent'
+    generation_policy = None
+    # Speculative generations record their calls from worker threads
+    _tokens_lock = threading.Lock()
+
+    def _call_parameters(self, step_number=None, remaining_steps=None):
+        if self.generation_policy is None:
+            return {}
+        return self.generation_policy.call_parameters(tokens_count=self.tokens_count, step_number=step_number,
+                                                      remaining_steps=remaining_steps)
+
+    def _invoke(self, message, model=None, step_number=None, remaining_steps=None):
+        """
+        Invokes the agent's model (or the given one), counts the output tokens and records the call metrics.
+        Calls of the agent's model follow its generation policy.
+
+        :return: The response message of the model.
+        """
+        return self._invoke_counted(message, model=model, step_number=step_number,
+                                    remaining_steps=remaining_steps)[0]
+
+    def _invoke_counted(self, message, model=None, step_number=None, remaining_steps=None):
+        """
+        Same as _invoke.
+
+        :return: The response message of the model and its number of output tokens.
+        """
+        parameters = self._call_parameters(step_number, remaining_steps) if model is None else {}
+        start = time.perf_counter()
+        response = (model or self.model).invoke(message, **parameters)
+        tokens = self._record_call(response, time.perf_counter() - start)
+        return response, tokens
+
+    async def _ainvoke(self, message, model=None, step_number=None, remaining_steps=None):
+        """
+        Asynchronous counterpart of _invoke.
+        """
+        parameters = self._call_parameters(step_number, remaining_steps) if model is None else {}
+        start = time.perf_counter()
+        response = await (model or self.model).ainvoke(message, **parameters)
+        self._record_call(response, time.perf_counter() - start)
+        return response
+
+    def _sample(self, message, n, **kwargs):
+        """
+        Requests n completions of the message in a single call.
+
+        :return: The contents of the completions.
+        """
+        start = time.perf_counter()
+        result = self.model.generate([message], n=n, **{**self._call_parameters(), **kwargs})
+        samples = [generation.message.content for generation in result.generations[0]]
+        self._record_call('\n'.join(samples), time.perf_counter() - start)
+        return samples
+
+    async def _asample(self, message, n, **kwargs):
+        """
+        Asynchronous counterpart of _sample.
+        """
+        start = time.perf_counter()
+        result = await self.model.agenerate([message], n=n, **{**self._call_parameters(), **kwargs})
+        samples = [generation.message.content for generation in result.generations[0]]
+        self._record_call('\n'.join(samples), time.perf_counter() - start)
+        return samples
+
+    def _record_call(self, response, latency):
+        tokens = count_tokens(text=response if isinstance(response, str) else response.content)
+        with self._tokens_lock:
+            self.tokens_count += tokens
+
+        llm_calls.inc(agent=self.name)
+        llm_latency.observe(latency, agent=self.name)
+        llm_tokens.observe(tokens, agent=self.name)
+        return tokens
+
     @staticmethod
     def _generate_model_prompt(system_prompt: str, task_prompt: str, input_variables: list) -> ChatPromptTemplate:
         """
@@ -0,0 +1,264 @@
+import time
+from typing import List, Optional
+
+from Agents.evaluator import Evaluator
+from Agents.parser import Parser
+from Prompts.prompts import output_formats
+from Utils.metrics import reparses
+
+
+class CascadeStats:
+    """
+    Tracks the calls, escalations and latencies of a cascade of a small and a large model.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.escalations = 0
+        self.small_latency = 0.0
+        self.large_latency = 0.0
+
+    def record(self, small_latency: float, large_latency: Optional[float] = None):
+        self.calls += 1
+        self.small_latency += small_latency
+        if large_latency is not None:
+            self.escalations += 1
+            self.large_latency += large_latency
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalations / self.calls if self.calls else 0.0
+
+    @property
+    def latency_savings(self) -> Optional[float]:
+        """
+        The estimated latency saved compared to sending every call to the large model,
+        based on the mean latency of the escalated calls. None before the first escalation.
+        """
+        if not self.escalations:
+            return None
+        mean_large_latency = self.large_latency / self.escalations
+        return self.calls * mean_large_latency - (self.small_latency + self.large_latency)
+
+    def report(self) -> dict:
+        return {
+            'calls': self.calls,
+            'escalations': self.escalations,
+            'escalation_rate': self.escalation_rate,
+            'small_latency': self.small_latency,
+            'large_latency': self.large_latency,
+            'latency_savings': self.latency_savings,
+        }
+
+
+class CascadeEvaluator:
+    """
+    Routes each evaluation to a small, fast evaluator first and escalates it to a large evaluator
+    only if the result is uncertain: the score cannot be parsed, it is within the margin of the
+    threshold, its confidence is low (logprob scoring mode) or its samples disagree (self-consistency scoring mode).
+    It can be used in place of an Evaluator.
+    """
+
+    def __init__(self, small: Evaluator, large: Evaluator, threshold: Optional[float] = None, margin: float = 0.1,
+                 min_confidence: float = 0.5):
+        """
+        :param small: The Evaluator bound to the small model.
+        :param large: The Evaluator bound to the large model.
+        :param threshold: The score (0 to 1) around which evaluations are escalated. If None, the threshold of each
+            call is used, i.e. the node threshold of the GraphManager evaluating the node.
+        :param margin: The distance to the threshold below which a score is uncertain.
+        :param min_confidence: The confidence below which a score of the logprob scoring mode is uncertain.
+        """
+        if small.scoring_mode != large.scoring_mode:
+            raise ValueError("The small and large evaluators must use the same scoring mode.")
+
+        self.small = small
+        self.large = large
+        self.threshold = threshold
+        self.margin = margin
+        self.min_confidence = min_confidence
+
+        self.scoring_mode = large.scoring_mode
+        self.stats = CascadeStats()
+
+    @property
+    def tokens_count(self):
+        return self.small.tokens_count + self.large.tokens_count
+
+    def score_node_path(self, node):
+        return self.large.score_node_path(node)
+
+    def evaluate_path(self, node_path):
+        return self.large.evaluate_path(node_path)
+
+    def score_extension_bound(self, node):
+        return self.large.score_extension_bound(node)
+
+    def _is_uncertain(self, score: Optional[float], threshold: Optional[float],
+                      confidence: Optional[float] = None) -> bool:
+        if score is None:
+            return True
+        if confidence is not None and confidence < self.min_confidence:
+            return True
+        threshold = self.threshold if self.threshold is not None else threshold
+        return threshold is not None and abs(score / 100 - threshold) < self.margin
+
+    @staticmethod
+    def _text_score(text: str) -> Optional[float]:
+        parsed_eval = Parser.extract_entries(text=text, keys=output_formats['evaluation_expected_keys'])
+        return float(parsed_eval[0]['Final Score']) if parsed_eval else None
+
+    def evaluate(self, threshold=None, **evaluation_inputs):
+        start = time.perf_counter()
+        result = self.small.evaluate(**evaluation_inputs, threshold=threshold)
+        small_latency = time.perf_counter() - start
+
+        if not self._is_uncertain(self._text_score(result), threshold):
+            self.stats.record(small_latency)
+            return result
+
+        start = time.perf_counter()
+        result = self.large.evaluate(**evaluation_inputs, threshold=threshold)
+        self.stats.record(small_latency, time.perf_counter() - start)
+        return result
+
+    async def aevaluate(self, threshold=None, **evaluation_inputs):
+        start = time.perf_counter()
+        result = await self.small.aevaluate(**evaluation_inputs, threshold=threshold)
+        small_latency = time.perf_counter() - start
+
+        if not self._is_uncertain(self._text_score(result), threshold):
+            self.stats.record(small_latency)
+            return result
+
+        start = time.perf_counter()
+        result = await self.large.aevaluate(**evaluation_inputs, threshold=threshold)
+        self.stats.record(small_latency, time.perf_counter() - start)
+        return result
+
+    def evaluate_with_logprobs(self, threshold=None, **evaluation_inputs):
+        start = time.perf_counter()
+        result = self.small.evaluate_with_logprobs(**evaluation_inputs, threshold=threshold)
+        small_latency = time.perf_counter() - start
+
+        if not self._is_uncertain(result['Final Score'], threshold, result['Confidence']):
+            self.stats.record(small_latency)
+            return result
+
+        start = time.perf_counter()
+        result = self.large.evaluate_with_logprobs(**evaluation_inputs, threshold=threshold)
+        self.stats.record(small_latency, time.perf_counter() - start)
+        return result
+
+    async def aevaluate_with_logprobs(self, threshold=None, **evaluation_inputs):
+        start = time.perf_counter()
+        result = await self.small.aevaluate_with_logprobs(**evaluation_inputs, threshold=threshold)
+        small_latency = time.perf_counter() - start
+
+        if not self._is_uncertain(result['Final Score'], threshold, result['Confidence']):
+            self.stats.record(small_latency)
+            return result
+
+        start = time.perf_counter()
+        result = await self.large.aevaluate_with_logprobs(**evaluation_inputs, threshold=threshold)
+        self.stats.record(small_latency, time.perf_counter() - start)
+        return result
+
+    def evaluate_with_samples(self, threshold=None, **evaluation_inputs):
+        start = time.perf_counter()
+        result = self.small.evaluate_with_samples(**evaluation_inputs, threshold=threshold)
+        small_latency = time.perf_counter() - start
+
+        if not self._is_uncertain(result['Final Score'], threshold) and result['Variance'] <= self.small.max_variance:
+            self.stats.record(small_latency)
+            return result
+
+        start = time.perf_counter()
+        result = self.large.evaluate_with_samples(**evaluation_inputs, threshold=threshold)
+        self.stats.record(small_latency, time.perf_counter() - start)
+        return result
+
+    async def aevaluate_with_samples(self, threshold=None, **evaluation_inputs):
+        start = time.perf_counter()
+        result = await self.small.aevaluate_with_samples(**evaluation_inputs, threshold=threshold)
+        small_latency = time.perf_counter() - start
+
+        if not self._is_uncertain(result['Final Score'], threshold) and result['Variance'] <= self.small.max_variance:
+            self.stats.record(small_latency)
+            return result
+
+        start = time.perf_counter()
+        result = await self.large.aevaluate_with_samples(**evaluation_inputs, threshold=threshold)
+        self.stats.record(small_latency, time.perf_counter() - start)
+        return result
+
+
+class CascadeParser:
+    """
+    Routes each parsing call to a small, fast parser first and escalates it to a large parser
+    only if the small model's output cannot be parsed. It can be used in place of a Parser.
+    """
+
+    def __init__(self, small: Parser, large: Parser):
+        """
+        :param small: The Parser bound to the small model.
+        :param large: The Parser bound to the large model.
+        """
+        self.small = small
+        self.large = large
+        self.stats = CascadeStats()
+
+    @property
+    def tokens_count(self):
+        return self.small.tokens_count + self.large.tokens_count
+
+    def filter_duplicate_thoughts(self, record_list):
+        return self.large.filter_duplicate_thoughts(record_list)
+
+    def parse(self, data: str, output_format: str, expected_keys: List[str]):
+        start = time.perf_counter()
+        message = self.small._parsing_message(data=data, output_format=output_format)
+        result = self.small._invoke(message).content
+        small_latency = time.perf_counter() - start
+
+        parsed_data = self.small.extract_entries(text=result, keys=expected_keys)
+        if parsed_data is not None:
+            self.stats.record(small_latency)
+            return parsed_data
+
+        start = time.perf_counter()
+        parsed_data = self.large.parse(data=data, output_format=output_format, expected_keys=expected_keys)
+        self.stats.record(small_latency, time.perf_counter() - start)
+        return parsed_data
+
+    async def aparse(self, data: str, output_format: str, expected_keys: List[str]):
+        start = time.perf_counter()
+        message = self.small._parsing_message(data=data, output_format=output_format)
+        result = (await self.small._ainvoke(message)).content
+        small_latency = time.perf_counter() - start
+
+        parsed_data = self.small.extract_entries(text=result, keys=expected_keys)
+        if parsed_data is not None:
+            self.stats.record(small_latency)
+            return parsed_data
+
+        start = time.perf_counter()
+        parsed_data = await self.large.aparse(data=data, output_format=output_format, expected_keys=expected_keys)
+        self.stats.record(small_latency, time.perf_counter() - start)
+        return parsed_data
+
+    def parse_output(self, text, output_format, keys):
+        parsed_data = self.small.extract_entries(text=text, keys=keys)
+        if parsed_data is not None:
+            return parsed_data
+        print('<', '=' * 30, 'Reparse')
+        reparses.inc(agent=self.small.name)
+        return self.parse(data=text, output_format=output_format, expected_keys=keys)
+
+    async def aparse_output(self, text, output_format, keys):
+        parsed_data = self.small.extract_entries(text=text, keys=keys)
+        if parsed_data is not None:
+            return parsed_data
+        print('<', '=' * 30, 'Reparse')
+        reparses.inc(agent=self.small.name)
+        return await self.aparse(data=text, output_format=output_format, expected_keys=keys)
@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import importlib.util
+import threading
+
+import httpx
+import openai
+
+from Utils.metrics import http_requests, http_in_flight
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=60)
+
+
+class CountedByteStream(httpx.SyncByteStream):
+    """
+    A response body calling on_close once when it is closed, i.e. when the request is no longer in flight.
+    """
+
+    def __init__(self, stream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            on_close, self.on_close = self.on_close, None
+            if on_close:
+                on_close()
+
+
+class AsyncCountedByteStream(httpx.AsyncByteStream):
+    """
+    Asynchronous counterpart of CountedByteStream.
+    """
+
+    def __init__(self, stream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            on_close, self.on_close = self.on_close, None
+            if on_close:
+                on_close()
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """
+    A transport counting the requests of a pooled client from when they are sent until their response body is
+    closed, or until they fail, time out or are cancelled.
+    """
+
+    def __init__(self, pooled_client, **kwargs):
+        super().__init__(**kwargs)
+        self.pooled_client = pooled_client
+
+    def handle_request(self, request):
+        self.pooled_client._start_request()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self.pooled_client._finish_request()
+            raise
+        response.stream = CountedByteStream(response.stream, self.pooled_client._finish_request)
+        return response
+
+
+class AsyncCountingTransport(httpx.AsyncBaseTransport):
+    """
+    Asynchronous counterpart of CountingTransport. The connections of a pool can only be used and closed on the
+    event loop that opened them, so one pool is kept per event loop, e.g. per asyncio.run of a sync caller.
+    The pools of the closed loops are dropped, their connections died with their loop.
+    """
+
+    def __init__(self, pooled_client, **kwargs):
+        self.pooled_client = pooled_client
+        self.transport_parameters = kwargs
+        self.transports = {}
+        self._lock = threading.Lock()
+
+    def _pop_closed(self):
+        with self._lock:
+            for loop in [loop for loop in self.transports if loop.is_closed()]:
+                del self.transports[loop]
+
+    def _transport(self):
+        self._pop_closed()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self.transports:
+                self.transports[loop] = httpx.AsyncHTTPTransport(**self.transport_parameters)
+            return self.transports[loop]
+
+    async def handle_async_request(self, request):
+        transport = self._transport()
+        self.pooled_client._start_request()
+        try:
+            response = await transport.handle_async_request(request)
+        except BaseException:
+            self.pooled_client._finish_request()
+            raise
+        response.stream = AsyncCountedByteStream(response.stream, self.pooled_client._finish_request)
+        return response
+
+    async def aclose(self):
+        """
+        Closes the pool of the running event loop and drops the pools of the closed loops.
+        """
+        self._pop_closed()
+        with self._lock:
+            transport = self.transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+    def close(self):
+        """
+        Closes the pools of the event loops that are not running, and drops the pools of the closed loops.
+        """
+        self._pop_closed()
+        with self._lock:
+            transports, self.transports = self.transports, {}
+        for loop, transport in transports.items():
+            if loop.is_running():
+                raise RuntimeError('The async pool of a running event loop must be closed with aclose on the loop.')
+            loop.run_until_complete(transport.aclose())
+
+
+class PooledClient:
+    """
+    An OpenAI client pair (sync and async) for one backend and credentials, sharing a tuned connection pool
+    per client between all the agents and solves of the process.
+    """
+
+    def __init__(self, name, base_url, api_key, limits=DEFAULT_LIMITS, timeout=600):
+        self.name = name
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        # HTTP/2 multiplexes the concurrent calls over few connections when the h2 package is available
+        http2 = importlib.util.find_spec('h2') is not None
+
+        self.http_client = httpx.Client(transport=CountingTransport(self, limits=limits, http2=http2),
+                                        timeout=timeout)
+        self.async_transport = AsyncCountingTransport(self, limits=limits, http2=http2)
+        self.http_async_client = httpx.AsyncClient(transport=self.async_transport, timeout=timeout)
+
+        self.client = openai.OpenAI(base_url=base_url, api_key=api_key, http_client=self.http_client)
+        self.async_client = openai.AsyncOpenAI(base_url=base_url, api_key=api_key,
+                                               http_client=self.http_async_client)
+
+    def _start_request(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            in_flight = self.in_flight
+        http_requests.inc(client=self.name)
+        http_in_flight.set(in_flight, client=self.name)
+
+    def _finish_request(self):
+        with self._lock:
+            self.in_flight -= 1
+            in_flight = self.in_flight
+        http_in_flight.set(in_flight, client=self.name)
+
+    @staticmethod
+    def _pool_stats(transports):
+        # httpx does not expose its pool publicly, the connection counts are best effort
+        try:
+            connections = [connection for transport in transports for connection in transport._pool.connections]
+        except AttributeError:
+            return {}
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {'connections': len(connections), 'idle_connections': idle}
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'sync_pool': self._pool_stats([self.http_client._transport]),
+            'async_pool': self._pool_stats(list(self.async_transport.transports.values())),
+        }
+
+    def close(self):
+        """
+        Closes the sync client and the async pools of the event loops that are not running. The pools of a
+        running event loop are closed with aclose.
+        """
+        self.http_client.close()
+        self.async_transport.close()
+
+    async def aclose(self):
+        """
+        Closes the sync client and the async pool of the running event loop.
+        """
+        self.http_client.close()
+        await self.async_transport.aclose()
+
+
+class ClientRegistry:
+    """
+    A process-wide registry of pooled clients keyed by base URL and credentials, so every agent bound to the
+    same backend reuses the same connections. The async clients keep one connection pool per event loop.
+    """
+
+    def __init__(self, limits=DEFAULT_LIMITS):
+        self.limits = limits
+        self.clients = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(base_url, api_key):
+        return base_url or 'default', hashlib.sha256(str(api_key).encode()).hexdigest()[:12]
+
+    def get(self, base_url, api_key):
+        key = self._key(base_url, api_key)
+        with self._lock:
+            if key not in self.clients:
+                self.clients[key] = PooledClient(name=f'{key[0]}#{key[1]}', base_url=base_url, api_key=api_key,
+                                                 limits=self.limits)
+            return self.clients[key]
+
+    def stats(self):
+        return {client.name: client.stats() for client in self.clients.values()}
+
+    def _pop_clients(self):
+        with self._lock:
+            clients = list(self.clients.values())
+            self.clients.clear()
+        return clients
+
+    def close(self):
+        for client in self._pop_clients():
+            client.close()
+
+    async def aclose(self):
+        for client in self._pop_clients():
+            await client.aclose()
+
+
+client_registry = ClientRegistry()
@@ -1,6 +1,36 @@
+import math
+import statistics
+
 from Agents.agent import Agent
 from Agents.LLM import LLM
-from Utils.utils import count_tokens
+from Agents.parser import Parser
+from Prompts.prompts import output_formats
+
+
+PATH_AGGREGATORS = {
+    'mean': lambda node: node.path_sum / node.path_count,
+    'sum': lambda node: node.path_sum,
+    'min': lambda node: node.path_min,
+    'geometric_mean': lambda node: math.exp(node.path_log_sum / node.path_count),
+}
+
+# The supremum of the path score over all the extensions of a path, given that node scores are at most 1.
+PATH_UPPER_BOUNDS = {
+    'mean': lambda node: 1.0,
+    'sum': lambda node: math.inf,
+    'min': lambda node: node.path_min,
+    'geometric_mean': lambda node: 1.0,
+}
+
+SCORING_MODES = ['text', 'logprob', 'self_consistency']
+
+SAMPLE_AGGREGATIONS = {
+    'mean': statistics.fmean,
+    'median': statistics.median,
+}
+
+# The single score tokens of the logprob scoring mode and their score on the 0-100 scale.
+LOGPROB_SCORE_TOKENS = {str(digit): digit * 100 / 9 for digit in range(10)}
 
 
 class Evaluator(Agent):
@@ -8,8 +38,50 @@ class Evaluator(Agent):
     The Evaluator class is responsible for the evaluation and guiding of new thoughts based on given inputs.
     """
 
-    def __init__(self, **model_parameters):
+    name = 'evaluator'
+
+    def __init__(self, path_aggregator='mean', scoring_mode='text', hint_threshold=None, num_samples=5,
+                 sample_aggregation='median', sample_temperature=0.7, max_variance=0.02, max_requeries=1,
+                 generation_policy=None, **model_parameters):
+        """
+        :param path_aggregator: The aggregator of the node scores along a path, a name of PATH_AGGREGATORS or a callable.
+        :param scoring_mode: 'text' to parse a free-text score and hint, 'logprob' to score from the logprobs of a single
+            score token and to generate a hint only for scores below hint_threshold, 'self_consistency' to aggregate
+            num_samples free-text evaluations requested in a single call.
+        :param hint_threshold: The score (0 to 1) below which a hint is generated in the logprob scoring mode.
+            If None, the threshold of each call is used, i.e. the GraphManager's node threshold.
+        :param num_samples: The number of completions requested per call in the self-consistency scoring mode.
+        :param sample_aggregation: The aggregation of the sampled scores, 'mean' or 'median'.
+        :param sample_temperature: The sampling temperature of the self-consistency scoring mode.
+        :param max_variance: The variance of the sampled scores (0 to 1 scale) above which the evaluation is re-queried.
+        :param max_requeries: The maximum number of additional sampling calls per evaluation.
+        :param generation_policy: The GenerationPolicy limiting the output of the calls, unlimited if None.
+            It does not apply to the single score token of the logprob scoring mode.
+        """
         super().__init__()
+        self.generation_policy = generation_policy
+        if scoring_mode not in SCORING_MODES:
+            raise ValueError(f"Scoring mode '{scoring_mode}' is not supported.")
+        if sample_aggregation not in SAMPLE_AGGREGATIONS:
+            raise ValueError(f"Sample aggregation '{sample_aggregation}' is not supported.")
+        self.scoring_mode = scoring_mode
+        self.hint_threshold = hint_threshold
+
+        self.num_samples = num_samples
+        self.sample_aggregation = SAMPLE_AGGREGATIONS[sample_aggregation]
+        self.sample_temperature = sample_temperature
+        self.max_variance = max_variance
+        self.max_requeries = max_requeries
+
+        if callable(path_aggregator):
+            self.path_aggregator = path_aggregator
+            self.path_upper_bound = lambda node: math.inf
+        elif path_aggregator in PATH_AGGREGATORS:
+            self.path_aggregator = PATH_AGGREGATORS[path_aggregator]
+            self.path_upper_bound = PATH_UPPER_BOUNDS[path_aggregator]
+        else:
+            raise ValueError(f"Path aggregator '{path_aggregator}' is not supported.")
+
         self.model = LLM(**model_parameters).get_model()
 
         self.system_prompt = (
@@ -35,33 +107,242 @@ class Evaluator(Agent):
             "Provide a score and a brief hint for improvement if necessary."
         )
 
+        self.score_system_prompt = (
+            "You are an expert in {domain}, designed to evaluate the effectiveness of the given solution step for the given problem. "
+            "Assess the solution step based on its logical coherence, alignment with problem requirements, "
+            "and its overall impact on the solution. "
+            "Consider that the step might be an intermediate one, building upon previous steps.\n"
+            "Answer with a single digit from 0 (ineffective) to 9 (highly effective) and nothing else."
+        )
+
+        self.score_task_prompt = (
+            "Problem:\n{initial_prompt}\n\n"
+            "Previous steps:\n{reasoning_states}\n\n"
+            "Evaluate this step:\n{state}\n\n"
+            "Score:"
+        )
+
+        self.hint_system_prompt = (
+            "You are an expert in {domain}, designed to guide the solution of the given problem step by step."
+        )
+
+        self.hint_task_prompt = (
+            "Problem:\n{initial_prompt}\n\n"
+            "Previous steps:\n{reasoning_states}\n\n"
+            "This step was judged ineffective:\n{state}\n\n"
+            "Rethink about the step and briefly suggest a more effective step or correction (recalculation). "
+            "Output only the hint, as short as possible."
+        )
+
+        self.score_model = self.model.bind(logprobs=True, top_logprobs=len(LOGPROB_SCORE_TOKENS), max_tokens=1)
+
         self.tokens_count = 0
 
-    def evaluate(self, input_data, thought, domain, reasoning_states):
+    def evaluate(self, input_data, thought, domain, reasoning_states, threshold=None):
         """
         Evaluate thoughts from the input data.
 
+        :param threshold: The node threshold of the search, unused by the free-text evaluation.
         :return: An evaluation of the thought or hypothesis.
         """
         print("\n=====> Starting Evaluating <=====")
 
-        prompt = self._generate_model_prompt(system_prompt=self.system_prompt,
-                                             task_prompt=self.task_prompt,
-                                             input_variables=["initial_prompt", "domain", "reasoning_states", "state"])
+        message = self._evaluation_message(self.system_prompt, self.task_prompt, input_data, thought, domain,
+                                           reasoning_states)
+
+        result = self._invoke(message).content
 
-        message = prompt.format_messages(initial_prompt=input_data, state=thought, domain=domain,
-                                         reasoning_states=reasoning_states)
+        return result
 
-        result = self.model(message).content
+    async def aevaluate(self, input_data, thought, domain, reasoning_states, threshold=None):
+        """
+        Asynchronous counterpart of evaluate.
+        """
+        print("\n=====> Starting Evaluating <=====")
 
-        self.tokens_count += count_tokens(text=result)
+        message = self._evaluation_message(self.system_prompt, self.task_prompt, input_data, thought, domain,
+                                           reasoning_states)
+
+        result = (await self._ainvoke(message)).content
 
         return result
 
+    def evaluate_with_logprobs(self, input_data, thought, domain, reasoning_states, threshold=None):
+        """
+        Scores a thought as the expected value of a single constrained score token under its logprobs,
+        and generates a hint only if the score is below the hint threshold.
+
+        :param threshold: The node threshold (0 to 1) of the search, below which a hint is generated unless
+            the evaluator has its own hint threshold. If both are None, a hint is always generated.
+        :return: A parsed evaluation with the 'Final Score' (0 to 100), 'Hint' and 'Confidence' keys.
+        """
+        print("\n=====> Starting Evaluating (logprob) <=====")
+
+        message = self._evaluation_message(self.score_system_prompt, self.score_task_prompt, input_data, thought,
+                                           domain, reasoning_states)
+
+        response = self._invoke(message, model=self.score_model)
+
+        score, confidence = self.score_distribution(response)
+
+        hint = ''
+        if self._needs_hint(score, threshold):
+            message = self._evaluation_message(self.hint_system_prompt, self.hint_task_prompt, input_data, thought,
+                                               domain, reasoning_states)
+            hint = self._invoke(message).content.strip()
+
+        return {'Final Score': score, 'Hint': hint, 'Confidence': confidence}
+
+    async def aevaluate_with_logprobs(self, input_data, thought, domain, reasoning_states, threshold=None):
+        """
+        Asynchronous counterpart of evaluate_with_logprobs.
+        """
+        print("\n=====> Starting Evaluating (logprob) <=====")
+
+        message = self._evaluation_message(self.score_system_prompt, self.score_task_prompt, input_data, thought,
+                                           domain, reasoning_states)
+
+        response = await self._ainvoke(message, model=self.score_model)
+
+        score, confidence = self.score_distribution(response)
+
+        hint = ''
+        if self._needs_hint(score, threshold):
+            message = self._evaluation_message(self.hint_system_prompt, self.hint_task_prompt, input_data, thought,
+                                               domain, reasoning_states)
+            hint = (await self._ainvoke(message)).content.strip()
+
+        return {'Final Score': score, 'Hint': hint, 'Confidence': confidence}
+
+    def evaluate_with_samples(self, input_data, thought, domain, reasoning_states, threshold=None):
+        """
+        Evaluates a thought from several completions requested in a single call, aggregating their scores.
+        The evaluation is re-queried while the variance of the scores is above the maximum variance.
+
+        :param threshold: The node threshold of the search, unused by the sampled evaluation.
+        :return: A parsed evaluation with the 'Final Score' (0 to 100), 'Hint' and 'Variance' keys. The score and
+            variance are None if no sample could be parsed.
+        """
+        print("\n=====> Starting Evaluating (self-consistency) <=====")
+
+        message = self._evaluation_message(self.system_prompt, self.task_prompt, input_data, thought, domain,
+                                           reasoning_states)
+
+        evaluations = []
+        for _ in range(self.max_requeries + 1):
+            samples = self._sample(message, n=self.num_samples, temperature=self.sample_temperature)
+            evaluations += self._parse_samples(samples)
+            if evaluations and self._score_variance(evaluations) <= self.max_variance:
+                break
+
+        return self._aggregate_samples(evaluations)
+
+    async def aevaluate_with_samples(self, input_data, thought, domain, reasoning_states, threshold=None):
+        """
+        Asynchronous counterpart of evaluate_with_samples.
+        """
+        print("\n=====> Starting Evaluating (self-consistency) <=====")
+
+        message = self._evaluation_message(self.system_prompt, self.task_prompt, input_data, thought, domain,
+                                           reasoning_states)
+
+        evaluations = []
+        for _ in range(self.max_requeries + 1):
+            samples = await self._asample(message, n=self.num_samples, temperature=self.sample_temperature)
+            evaluations += self._parse_samples(samples)
+            if evaluations and self._score_variance(evaluations) <= self.max_variance:
+                break
+
+        return self._aggregate_samples(evaluations)
+
+    @staticmethod
+    def _parse_samples(samples):
+        # Keep the first evaluation of each sample whose score can be parsed
+        keys = output_formats['evaluation_expected_keys']
+        parsed_samples = [Parser.extract_entries(text=sample, keys=keys) for sample in samples]
+        return [parsed[0] for parsed in parsed_samples if parsed]
+
+    @staticmethod
+    def _score_variance(evaluations):
+        scores = [float(evaluation['Final Score']) / 100 for evaluation in evaluations]
+        return statistics.pvariance(scores)
+
+    def _aggregate_samples(self, evaluations):
+        if not evaluations:
+            return {'Final Score': None, 'Hint': '', 'Variance': None}
+
+        scores = [float(evaluation['Final Score']) for evaluation in evaluations]
+        score = self.sample_aggregation(scores)
+
+        # Take the hint of the sample closest to the aggregated score
+        closest = min(range(len(scores)), key=lambda i: abs(scores[i] - score))
+        return {'Final Score': score, 'Hint': evaluations[closest]['Hint'],
+                'Variance': self._score_variance(evaluations)}
+
+    def _evaluation_message(self, system_prompt, task_prompt, input_data, thought, domain, reasoning_states):
+        prompt = self._generate_model_prompt(system_prompt=system_prompt,
+                                             task_prompt=task_prompt,
+                                             input_variables=["initial_prompt", "domain", "reasoning_states", "state"])
+
+        return prompt.format_messages(initial_prompt=input_data, state=thought, domain=domain,
+                                      reasoning_states=reasoning_states)
+
+    def _needs_hint(self, score, threshold):
+        hint_threshold = self.hint_threshold if self.hint_threshold is not None else threshold
+        return hint_threshold is None or score / 100 < hint_threshold
+
+    @staticmethod
+    def expected_score(response):
+        """
+        Computes the expected score (0 to 100) from the top logprobs of the first generated token.
+        Falls back to the generated token itself if no score token is among the top logprobs.
+        """
+        return Evaluator.score_distribution(response)[0]
+
+    @staticmethod
+    def score_distribution(response):
+        """
+        Computes the expected score (0 to 100) and its confidence, the probability of the most likely score token
+        renormalized over the score tokens, from the top logprobs of the first generated token.
+        """
+        logprobs = response.response_metadata.get('logprobs') or {}
+        content = logprobs.get('content') or []
+        top_logprobs = content[0].get('top_logprobs', []) if content else []
+
+        weights = {}
+        for candidate in top_logprobs:
+            token = candidate['token'].strip()
+            if token in LOGPROB_SCORE_TOKENS:
+                weights[token] = weights.get(token, 0.0) + math.exp(candidate['logprob'])
+
+        total = sum(weights.values())
+        if total > 0:
+            score = sum(LOGPROB_SCORE_TOKENS[token] * weight for token, weight in weights.items()) / total
+            return score, max(weights.values()) / total
+
+        return LOGPROB_SCORE_TOKENS.get(response.content.strip()[:1], 0.0), 0.0
+
     def evaluate_path(self, node_path):
-        node_sum = 0
-        for node in node_path[1:]:
-            node_sum += node.score
+        return self.score_node_path(node_path[-1])
+
+    def score_node_path(self, node):
+        """
+        Scores the path root -> node from the aggregates kept incrementally on the node.
 
-        path_score = node_sum / (len(node_path) - 1)
-        return path_score
+        :param node: The last node of the path.
+        :return: The aggregated path score, 0 for a path without scored nodes.
+        """
+        if node.path_count == 0:
+            return 0.0
+        return self.path_aggregator(node)
+
+    def score_extension_bound(self, node):
+        """
+        Bounds the score of any path extending the path root -> node.
+
+        :param node: The last node of the path.
+        :return: An upper bound of the aggregated path scores of the extensions.
+        """
+        if node.path_count == 0:
+            return math.inf
+        return self.path_upper_bound(node)
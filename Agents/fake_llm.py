@@ -0,0 +1,61 @@
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class FakeLogprobChatModel(BaseChatModel):
+    """
+    A local chat model for the logprob scoring mode. Calls requesting logprobs return the most likely score token
+    with the given top logprobs, the other calls return the given text (e.g. the hint).
+    """
+
+    top_probabilities: Dict[str, float]
+    text: str = ''
+    calls: List[dict] = []
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    @property
+    def _llm_type(self) -> str:
+        return 'fake-logprob'
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        self.calls.append(kwargs)
+
+        if not kwargs.get('logprobs'):
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.text))])
+
+        top_logprobs = [{'token': token, 'logprob': math.log(probability)}
+                        for token, probability in self.top_probabilities.items()]
+        token = max(self.top_probabilities, key=self.top_probabilities.get)
+        metadata = {'logprobs': {'content': [{'token': token, 'logprob': math.log(self.top_probabilities[token]),
+                                              'top_logprobs': top_logprobs}]}}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=token, response_metadata=metadata))])
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    A local chat model answering each call with respond(prompt), where prompt is the content of the last message.
+    """
+
+    respond: Callable[[str], str]
+    calls: List[dict] = []
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    @property
+    def _llm_type(self) -> str:
+        return 'scripted'
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        self.calls.append({'stop': stop, **kwargs})
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.respond(messages[-1].content)))])
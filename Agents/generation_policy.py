@@ -0,0 +1,74 @@
+from typing import List, Optional
+
+
+class TokenBudgetExceeded(Exception):
+    """
+    Raised instead of calling the model once an agent has spent its token budget.
+    """
+
+
+class GenerationPolicy:
+    """
+    Per-agent limits on the generated output: stop sequences and a per-call max-token limit
+    derived from the steps left before the maximum depth and the remaining token budget of the agent.
+    """
+
+    def __init__(self, stop: Optional[List[str]] = None, max_tokens: Optional[int] = None,
+                 max_steps: Optional[int] = None, tokens_per_step: Optional[int] = None,
+                 token_budget: Optional[int] = None):
+        """
+        :param stop: Stop sequences applied to every call, e.g. "'Hint'" to drop the evaluator's hints.
+        :param max_tokens: The maximum number of output tokens per call.
+        :param max_steps: The maximum number of steps generated per call, enforced by stopping at the header
+            of the step following the last one. A call never generates more steps than are left before the
+            maximum depth of the search.
+        :param tokens_per_step: The expected number of tokens per step, limiting a call to max_steps steps of tokens.
+        :param token_budget: The total number of output tokens the agent may generate. Each call is limited to
+            the remaining budget, and once it is spent the calls raise TokenBudgetExceeded, which stops the search.
+            The final answer of a solve is generated regardless of the budget.
+        """
+        self.stop = stop or []
+        self.max_tokens = max_tokens
+        self.max_steps = max_steps
+        self.tokens_per_step = tokens_per_step
+        self.token_budget = token_budget
+
+    def call_parameters(self, tokens_count: int, step_number: Optional[int] = None,
+                        remaining_steps: Optional[int] = None) -> dict:
+        """
+        Derives the stop sequences and the max-token limit of a call.
+
+        :param tokens_count: The number of output tokens generated by the agent so far.
+        :param step_number: The number of the first step generated by the call, if the call generates steps.
+        :param remaining_steps: The number of steps left before the maximum depth of the search, if known.
+        :return: The keyword arguments of the model call.
+        :raises TokenBudgetExceeded: If the token budget is spent.
+        """
+        parameters = {}
+
+        steps = None
+        if step_number is not None:
+            step_limits = [limit for limit in (self.max_steps, remaining_steps) if limit is not None]
+            steps = max(1, min(step_limits)) if step_limits else None
+
+        stop = list(self.stop)
+        if steps is not None:
+            last_step = step_number + steps
+            stop += [f"Step {last_step}", f"'Step': {last_step}"]
+        if stop:
+            parameters['stop'] = stop
+
+        limits = []
+        if self.max_tokens:
+            limits.append(self.max_tokens)
+        if self.tokens_per_step and steps is not None:
+            limits.append(self.tokens_per_step * steps)
+        if self.token_budget is not None:
+            remaining_budget = self.token_budget - tokens_count
+            if remaining_budget <= 0:
+                raise TokenBudgetExceeded(f"The token budget of {self.token_budget} output tokens is spent.")
+            limits.append(remaining_budget)
+        if limits:
+            parameters['max_tokens'] = min(limits)
+
+        return parameters
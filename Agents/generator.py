@@ -1,8 +1,9 @@
+from typing import Optional, Tuple
+
 from langchain_core.messages import HumanMessage
 
 from Agents.agent import Agent
 from Agents.LLM import LLM
-from Utils.utils import count_tokens
 
 
 class Generator(Agent):
@@ -10,8 +11,15 @@ class Generator(Agent):
     The Generator class is responsible for the creation and generation of new thoughts based on given inputs.
     """
 
-    def __init__(self, **model_parameters):
+    name = 'generator'
+
+    def __init__(self, generation_policy=None, **model_parameters):
+        """
+        :param generation_policy: The GenerationPolicy limiting the output of the calls, unlimited if None.
+            It does not apply to the final answer.
+        """
         super().__init__()
+        self.generation_policy = generation_policy
         self.model = LLM(**model_parameters).get_model()
 
         self.system_prompt = (
@@ -46,12 +54,51 @@ class Generator(Agent):
         self.tokens_count = 0
 
     def generate(self, initial_prompt: str, domain: str, reasoning_states: str, rejected_actions: str, hint: str,
-                 step_number: int) -> str:
+                 step_number: int, remaining_steps: Optional[int] = None) -> str:
         """
         Generates response from the input data.
+
+        :param remaining_steps: The number of steps left before the maximum depth of the search, limiting the
+            generated steps under a generation policy.
+        """
+        return self.generate_counted(initial_prompt=initial_prompt, domain=domain, reasoning_states=reasoning_states,
+                                     rejected_actions=rejected_actions, hint=hint, step_number=step_number,
+                                     remaining_steps=remaining_steps)[0]
+
+    def generate_counted(self, initial_prompt: str, domain: str, reasoning_states: str, rejected_actions: str,
+                         hint: str, step_number: int, remaining_steps: Optional[int] = None) -> Tuple[str, int]:
+        """
+        Same as generate.
+
+        :return: The generated response and its number of output tokens.
+        """
+        print("\n=====> Starting Generating <=====")
+
+        message = self._generation_message(initial_prompt=initial_prompt, domain=domain,
+                                            reasoning_states=reasoning_states, rejected_actions=rejected_actions,
+                                            hint=hint, step_number=step_number)
+
+        response, tokens = self._invoke_counted(message, step_number=step_number, remaining_steps=remaining_steps)
+
+        return response.content, tokens
+
+    async def agenerate(self, initial_prompt: str, domain: str, reasoning_states: str, rejected_actions: str,
+                        hint: str, step_number: int, remaining_steps: Optional[int] = None) -> str:
+        """
+        Asynchronous counterpart of generate.
         """
         print("\n=====> Starting Generating <=====")
 
+        message = self._generation_message(initial_prompt=initial_prompt, domain=domain,
+                                            reasoning_states=reasoning_states, rejected_actions=rejected_actions,
+                                            hint=hint, step_number=step_number)
+
+        result = (await self._ainvoke(message, step_number=step_number, remaining_steps=remaining_steps)).content
+
+        return result
+
+    def _generation_message(self, initial_prompt: str, domain: str, reasoning_states: str, rejected_actions: str,
+                            hint: str, step_number: int):
         prompt = self._generate_model_prompt(system_prompt=self.system_prompt,
                                              task_prompt=self.task_prompt,
                                              input_variables=["initial_prompt",
@@ -70,13 +117,25 @@ class Generator(Agent):
         # print('Prompt', '-' * 50)
         # print(message[1].content)
 
-        result = self.model(message).content
+        return message
 
-        self.tokens_count += count_tokens(text=result)
+    def generate_solution(self, init_problem, path):
+        message = self._solution_message(init_problem=init_problem, path=path)
+
+        # Passing the model explicitly bypasses the generation policy, so the final answer is written
+        # even once the token budget is spent
+        result = self._invoke(message, model=self.model).content
 
         return result
 
-    def generate_solution(self, init_problem, path):
+    async def agenerate_solution(self, init_problem, path):
+        message = self._solution_message(init_problem=init_problem, path=path)
+
+        result = (await self._ainvoke(message, model=self.model)).content
+
+        return result
+
+    def _solution_message(self, init_problem, path):
         answer_path = [node.as_string() for node in path]
         answer_path = '\n'.join(answer_path)
 
@@ -95,10 +154,4 @@ class Generator(Agent):
 
         prompt = self._generate_model_prompt(system_prompt=" ", task_prompt=task_prompt,
                                              input_variables=["init_problem", "answer_path"])
-        message = prompt.format_messages(init_problem=init_problem, answer_path=answer_path)
-
-        result = self.model(message).content
-        self.tokens_count += count_tokens(text=result)
-
-        return result
-
+        return prompt.format_messages(init_problem=init_problem, answer_path=answer_path)
@@ -1,6 +1,7 @@
 import re
 from typing import List, Dict, Any, Union
-from Utils.utils import extract_and_validate, count_tokens
+from Utils.utils import extract_and_validate
+from Utils.metrics import reparses
 from Agents.LLM import LLM
 from Agents.agent import Agent
 # from Prompts.prompts import parser_configs
@@ -12,8 +13,14 @@ class Parser(Agent):
     utilized by the Generator and Evaluator classes.
     """
 
-    def __init__(self, **model_parameters):
+    name = 'parser'
+
+    def __init__(self, generation_policy=None, **model_parameters):
+        """
+        :param generation_policy: The GenerationPolicy limiting the output of the calls, unlimited if None.
+        """
         super().__init__()
+        self.generation_policy = generation_policy
         self.model = LLM(**model_parameters).get_model()
 
         self.system_prompt = (
@@ -38,19 +45,58 @@ class Parser(Agent):
         """
 
         print("\n=====> Starting Parsing <=====")
+        formatted_message = self._parsing_message(data=data, output_format=output_format)
+        result = self._invoke(formatted_message).content
+
+        return self.parse_output(text=result, output_format=output_format, keys=expected_keys)
+
+    async def aparse(self, data: str, output_format: str, expected_keys: List[str]) -> \
+            Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Asynchronous counterpart of parse.
+        """
+
+        print("\n=====> Starting Parsing <=====")
+        formatted_message = self._parsing_message(data=data, output_format=output_format)
+        result = (await self._ainvoke(formatted_message)).content
+
+        return await self.aparse_output(text=result, output_format=output_format, keys=expected_keys)
+
+    def _parsing_message(self, data: str, output_format: str):
         prompt = self._generate_model_prompt(system_prompt=self.system_prompt,
                                              task_prompt=self.task_prompt,
                                              input_variables=["output_format", "input_data"])
 
-        formatted_message = prompt.format_messages(output_format=output_format, input_data=data)
-        result = self.model(formatted_message).content
+        return prompt.format_messages(output_format=output_format, input_data=data)
 
-        self.tokens_count += count_tokens(text=result)
+    def parse_output(self, text, output_format, keys):
+        parsed_data = self.extract_entries(text=text, keys=keys)
+        if parsed_data is not None:
+            return parsed_data
+        else:
+            print('<', '=' * 30, 'Reparse')
+            reparses.inc(agent=self.name)
+            return self.parse(data=text, output_format=output_format, expected_keys=keys)
 
-        return self.parse_output(text=result, output_format=output_format, keys=expected_keys)
+    async def aparse_output(self, text, output_format, keys):
+        """
+        Asynchronous counterpart of parse_output, re-parsing with aparse.
+        """
+        parsed_data = self.extract_entries(text=text, keys=keys)
+        if parsed_data is not None:
+            return parsed_data
+        else:
+            print('<', '=' * 30, 'Reparse')
+            reparses.inc(agent=self.name)
+            return await self.aparse(data=text, output_format=output_format, expected_keys=keys)
 
-    def parse_output(self, text, output_format, keys):
+    @staticmethod
+    def extract_entries(text, keys):
+        """
+        Extracts the entries with the given keys from the text with regular expressions.
 
+        :return: The list of extracted entries, or None if they are not valid.
+        """
         def validate_dicts(dict_list, required_keys):
             """
             This function takes a list of dictionaries and a set of required keys,
@@ -100,11 +146,7 @@ class Parser(Agent):
             parsed_entry = {key: matches[key][i].strip() if i < len(matches[key]) else "N/A" for key in keys}
             parsed_data.append(parsed_entry)
 
-        if validate_dicts(parsed_data, keys):
-            return parsed_data
-        else:
-            print('<', '=' * 30, 'Reparse')
-            return self.parse(data=text, output_format=output_format, expected_keys=keys)
+        return parsed_data if validate_dicts(parsed_data, keys) else None
 
     def filter_duplicate_thoughts(self, record_list):
         """
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class RecordedChatModel(BaseChatModel):
+    """
+    A chat model replaying recorded responses, keyed by the messages and the call parameters.
+    Given a backend model, the responses missing from the recording are requested from it and appended
+    to the recording, so a run can be recorded once and replayed offline and reproducibly afterwards.
+    """
+
+    recording_path: str
+    model: Optional[BaseChatModel] = None
+    responses: dict = {}
+    calls: int = 0
+    replayed_latency: float = 0.0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.responses = {}
+        if os.path.exists(self.recording_path):
+            with open(self.recording_path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self.responses[record['key']] = record
+
+    @property
+    def _llm_type(self) -> str:
+        return 'recorded'
+
+    @staticmethod
+    def _key(messages: List[BaseMessage], stop: Optional[List[str]], **kwargs) -> str:
+        payload = {
+            'messages': [(message.type, message.content) for message in messages],
+            'stop': stop,
+            'parameters': {key: kwargs[key] for key in sorted(kwargs) if key != 'run_manager'},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _record(self, key: str, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs) -> dict:
+        if self.model is None:
+            raise KeyError(f"No recorded response for the call {key} and no backend model to record it from.")
+
+        start = time.perf_counter()
+        result = self.model.generate([messages], stop=stop, **kwargs)
+        record = {
+            'key': key,
+            'latency': time.perf_counter() - start,
+            'generations': [{'content': generation.message.content,
+                             'response_metadata': generation.message.response_metadata}
+                            for generation in result.generations[0]],
+        }
+
+        directory = os.path.dirname(self.recording_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.recording_path, 'a') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+
+        self.responses[key] = record
+        return record
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        key = self._key(messages, stop, **kwargs)
+        record = self.responses.get(key) or self._record(key, messages, stop, **kwargs)
+
+        self.calls += 1
+        self.replayed_latency += record['latency']
+
+        return ChatResult(generations=[
+            ChatGeneration(message=AIMessage(content=generation['content'],
+                                             response_metadata=generation['response_metadata']))
+            for generation in record['generations']
+        ])
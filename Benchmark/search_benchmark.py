@@ -0,0 +1,162 @@
+import argparse
+import csv
+import itertools
+import json
+import random
+import re
+import time
+
+from Agents.evaluator import Evaluator
+from Agents.generator import Generator
+from Agents.parser import Parser
+from Agents.recorded_llm import RecordedChatModel
+from Graph.graph_manager import GraphManager
+
+DEFAULT_SEARCH_SPACE = {
+    'node_threshold': [0.3, 0.5, 0.7],
+    'path_threshold': [0.6, 0.8],
+    'max_width': [2, 3],
+    'max_depth': [3, 5],
+    'iteration_limit': [10, 30],
+    'down_up': [True, False],
+}
+
+SEARCH_KEYS = ['iteration_limit', 'down_up']
+MANAGER_KEYS = ['node_threshold', 'path_threshold', 'max_width', 'max_depth']
+COST_KEYS = ['tokens', 'calls', 'latency']
+
+
+def load_problems(path):
+    """
+    Loads a problem set stored as JSON lines holding an 'id', a 'prompt' and a reference 'answer'.
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def configurations(search_space, samples=None, seed=0):
+    """
+    Enumerates the grid of the search space, or draws the given number of random configurations from it.
+    """
+    keys = list(search_space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(search_space[key] for key in keys))]
+    if samples is None or samples >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, samples)
+
+
+def normalize_answer(text):
+    return re.sub(r'[^a-z0-9.]+', ' ', str(text).lower()).strip()
+
+
+def is_correct(final_answer, reference):
+    """
+    Checks if the reference answer appears in the final answer, as a number or as normalized text.
+    """
+    numbers = re.findall(r'-?\d+(?:\.\d+)?', str(reference).replace(',', ''))
+    if len(numbers) == 1:
+        answer_numbers = re.findall(r'-?\d+(?:\.\d+)?', str(final_answer).replace(',', ''))
+        return any(float(number) == float(numbers[0]) for number in answer_numbers)
+    return normalize_answer(reference) in normalize_answer(final_answer)
+
+
+def run_configuration(config, problems, chat_model):
+    """
+    Solves all the problems with one configuration and measures its accuracy and cost.
+    The latency is the sum of the recorded latencies of the LLM calls, so it is reproducible across replays.
+    The wall time of the replay is reported in its own column and is not part of the cost.
+    """
+    generator, evaluator, parser = (Generator(chat_model=chat_model), Evaluator(chat_model=chat_model),
+                                    Parser(chat_model=chat_model))
+
+    correct = 0
+    calls, replayed_latency, start = chat_model.calls, chat_model.replayed_latency, time.perf_counter()
+    for problem in problems:
+        graph_manager = GraphManager(problem['prompt'], generator, evaluator, parser,
+                                     **{key: config[key] for key in MANAGER_KEYS})
+        final_answer = graph_manager.solve('search', **{key: config[key] for key in SEARCH_KEYS})
+        correct += is_correct(final_answer, problem['answer'])
+
+    elapsed = time.perf_counter() - start
+    return {
+        **config,
+        'accuracy': correct / len(problems),
+        'tokens': generator.tokens_count + evaluator.tokens_count + parser.tokens_count,
+        'calls': chat_model.calls - calls,
+        'latency': chat_model.replayed_latency - replayed_latency,
+        'wall_time': elapsed,
+    }
+
+
+def pareto_front(results):
+    """
+    Marks the results that no other result dominates: at least as accurate and at most as costly
+    in tokens, calls and latency, and strictly better in one of them.
+    """
+    for result in results:
+        result['pareto'] = not any(
+            other['accuracy'] >= result['accuracy'] and all(other[key] <= result[key] for key in COST_KEYS) and
+            (other['accuracy'] > result['accuracy'] or any(other[key] < result[key] for key in COST_KEYS))
+            for other in results
+        )
+    return results
+
+
+def format_table(results):
+    columns = list(results[0])
+    rows = [columns] + [[f'{row[column]:.3f}' if isinstance(row[column], float) else str(row[column])
+                         for column in columns] for row in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    lines = [' | '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows]
+    lines.insert(1, '-+-'.join('-' * width for width in widths))
+    return '\n'.join(lines)
+
+
+def run_benchmark(problems, chat_model, search_space=None, samples=None, seed=0):
+    """
+    Runs a sweep of search configurations over the problems and returns the results sorted by accuracy
+    then tokens, with their Pareto optimality.
+    """
+    results = [run_configuration(config, problems, chat_model)
+               for config in configurations(search_space or DEFAULT_SEARCH_SPACE, samples=samples, seed=seed)]
+    return sorted(pareto_front(results), key=lambda result: (-result['accuracy'], result['tokens']))
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Sweep GoAT search configurations over a problem set.')
+    argument_parser.add_argument('--problems', required=True, help='JSON lines with id, prompt and answer.')
+    argument_parser.add_argument('--recording', required=True, help='JSON lines recording of the LLM responses.')
+    argument_parser.add_argument('--search-space', default=None, help='JSON file mapping parameters to values.')
+    argument_parser.add_argument('--samples', type=int, default=None, help='Random configurations instead of the grid.')
+    argument_parser.add_argument('--seed', type=int, default=0)
+    argument_parser.add_argument('--output', default=None, help='CSV file for the results.')
+    argument_parser.add_argument('--record-model-name', default=None,
+                                 help='Record the missing responses from this model instead of failing.')
+    argument_parser.add_argument('--base-url', default=None)
+    argument_parser.add_argument('--api-key', default=None)
+    args = argument_parser.parse_args()
+
+    backend = None
+    if args.record_model_name:
+        from Agents.LLM import LLM
+        backend = LLM(model_name=args.record_model_name, base_url=args.base_url, api_key=args.api_key).get_model()
+    chat_model = RecordedChatModel(recording_path=args.recording, model=backend)
+
+    search_space = None
+    if args.search_space:
+        with open(args.search_space) as f:
+            search_space = json.load(f)
+
+    results = run_benchmark(load_problems(args.problems), chat_model, search_space=search_space,
+                            samples=args.samples, seed=args.seed)
+    print(format_table(results))
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,8 +6,9 @@ from pyvis.network import Network
 class Graph:
     def __init__(self, name='Visualizations/GoAT.html', height='1000px', width='100%', bg_color='white',
                  font_color='black',
-                 directed=True, pruning_threshold=0.5):
+                 directed=True, pruning_threshold=0.5, event_stream=None):
         self.name = name
+        self.event_stream = event_stream
         self.graph = nx.DiGraph() if directed else nx.Graph()
         self.height = height
         self.width = width
@@ -45,19 +46,48 @@ class Graph:
             if node.parent is not None:
                 self.graph.add_edge(node.parent.id, node.id)
 
+            if self.event_stream:
+                self.event_stream.emit('node_added', id=node.id, depth=node.depth, color=color, shape=shape,
+                                       title=node.as_string())
+                self.event_stream.emit('score_set', id=node.id, score=node.score)
+                if node.parent is not None:
+                    self.event_stream.emit('edge_added', source=node.parent.id, target=node.id)
+
     def add_edge(self, edge, label=None, title=None):
         self.graph.add_edge(*edge, label=label, title=title)
+        if self.event_stream:
+            self.event_stream.emit('edge_added', source=edge[0], target=edge[1], label=label)
+
+    def remove_node(self, node):
+        """
+        Removes a pruned node and its edges from the graph.
+        """
+        if self.graph.has_node(node.id):
+            self.graph.remove_node(node.id)
+        self.mark_pruned(node)
+
+    def mark_pruned(self, node, parent=None):
+        """
+        Reports a node rejected from the graph to the event stream.
+        """
+        if self.event_stream:
+            self.event_stream.emit('node_pruned', id=node.id, parent=parent.id if parent is not None else None,
+                                   title=node.as_string() + f"\n\nScore: {node.score}")
 
     def get_nodes(self):
         return [node for node, data in self.node_properties.items()]
 
     def highlight_solution(self, solution):
+        solution_ids = [n.id for n in solution]
         for id, data in self.graph.nodes.items():
-            if id in [n.id for n in solution]:
+            if id in solution_ids:
                 data["color"] = "#944ef5"
             else:
                 data["color"] = "#429bf5"
 
+        if self.event_stream:
+            self.event_stream.emit('solution_highlighted', ids=solution_ids)
+
     def show_graph(self, show_buttons=False, layout_options=False):
         pyvis_graph = Network(height=self.height, width=self.width, bgcolor=self.bg_color, font_color=self.font_color,
                               directed=self.graph.is_directed())
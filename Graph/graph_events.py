@@ -0,0 +1,183 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class GraphEventStream:
+    """
+    An append-only JSON lines stream of graph deltas (node added, score set, edge added, node pruned,
+    solution highlighted). Events are handed to a background writer thread, so emitting never blocks the search.
+    """
+
+    def __init__(self, path='Visualizations/GoAT_events.jsonl', flush_interval=0.5):
+        """
+        :param path: The file the events are appended to.
+        :param flush_interval: The maximum delay in seconds before the written events are flushed.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.closed = False
+        self.events = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self._write, daemon=True, name='goat-graph-events')
+        self.writer.start()
+
+        # The writer is a daemon thread, write the pending events at exit if the stream was not closed
+        atexit.register(self.close)
+
+    def emit(self, event_type, **data):
+        if self.closed:
+            raise ValueError('Cannot emit an event on a closed GraphEventStream.')
+        self.events.put({'type': event_type, 'time': time.time(), **data})
+
+    def flush(self):
+        """
+        Waits until the pending events are written and flushed. The stream stays open.
+        """
+        if self.closed:
+            return
+        written = threading.Event()
+        self.events.put(written)
+        written.wait()
+
+    def close(self):
+        """
+        Writes the pending events and stops the writer thread. Closing a closed stream does nothing.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        self.events.put(None)
+        self.writer.join()
+
+    def _write(self):
+        with open(self.path, 'a') as f:
+            while True:
+                try:
+                    event = self.events.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    f.flush()
+                    continue
+
+                # Write all the available events before flushing them at once
+                flushes = []
+                while event is not None:
+                    if isinstance(event, threading.Event):
+                        flushes.append(event)
+                    else:
+                        f.write(json.dumps(event) + '\n')
+                    try:
+                        event = self.events.get_nowait()
+                    except queue.Empty:
+                        break
+                f.flush()
+                for written in flushes:
+                    written.set()
+
+                if event is None:
+                    return
+
+
+LIVE_VIEW_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>GoAT live view</title>
+<script src="https://unpkg.com/vis-network/standalone/umd/vis-network.min.js"></script>
+<style>html, body, #graph { height: 100%; margin: 0; }</style>
+</head>
+<body>
+<div id="graph"></div>
+<script>
+const nodes = new vis.DataSet();
+const edges = new vis.DataSet();
+new vis.Network(document.getElementById('graph'), {nodes, edges}, {
+    layout: {hierarchical: {enabled: true, direction: 'UD', sortMethod: 'directed'}},
+    edges: {arrows: 'to'}
+});
+let offset = 0;
+
+function apply(event) {
+    if (event.type === 'node_added') {
+        nodes.update({id: event.id, label: event.id, title: event.title, level: event.depth,
+                      color: event.color, shape: event.shape});
+    } else if (event.type === 'score_set') {
+        const node = nodes.get(event.id);
+        if (node) nodes.update({id: event.id, title: (node.title || '') + '\\n\\nScore: ' + event.score});
+    } else if (event.type === 'edge_added') {
+        edges.update({id: event.source + '->' + event.target, from: event.source, to: event.target,
+                      label: event.label || undefined});
+    } else if (event.type === 'node_pruned') {
+        if (event.parent) {
+            nodes.update({id: event.id, label: event.id, title: event.title, color: '#d14949', shape: 'box'});
+            edges.update({id: event.parent + '->' + event.id, from: event.parent, to: event.id, dashes: true});
+        } else {
+            nodes.remove(event.id);
+        }
+    } else if (event.type === 'solution_highlighted') {
+        const solution = new Set(event.ids);
+        nodes.update(nodes.getIds().map(id => ({id, color: solution.has(id) ? '#944ef5' : '#429bf5'})));
+    }
+}
+
+async function poll() {
+    const response = await fetch('/events?offset=' + offset);
+    const body = await response.json();
+    body.events.forEach(apply);
+    offset = body.offset;
+}
+setInterval(poll, 1000);
+poll();
+</script>
+</body>
+</html>
+"""
+
+
+def serve_live_view(path='Visualizations/GoAT_events.jsonl', port=8765, host='127.0.0.1'):
+    """
+    Serves a live view of an event stream on http://host:port/. The page polls the new events
+    from their byte offset in the stream and applies them incrementally to the displayed graph.
+    """
+
+    class LiveViewHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/events':
+                offset = int(parse_qs(url.query).get('offset', ['0'])[0])
+                events = []
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        f.seek(offset)
+                        for line in f:
+                            # Leave a partially written last line for the next poll
+                            if not line.endswith(b'\n'):
+                                break
+                            events.append(json.loads(line))
+                            offset += len(line)
+                body, content_type = json.dumps({'events': events, 'offset': offset}).encode(), 'application/json'
+            else:
+                body, content_type = LIVE_VIEW_HTML.encode(), 'text/html'
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), LiveViewHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,12 +1,21 @@
+import math
+import time
 from queue import PriorityQueue
-from typing import List, Any, Optional, Callable, Dict, Tuple
+from typing import List, Any, Optional, Callable, Dict, Tuple, Awaitable
 from Agents.parser import Parser
 from Agents.generator import Generator
 from Agents.evaluator import Evaluator
+from Agents.generation_policy import TokenBudgetExceeded
 
 from Graph.graph import Graph
+from Graph.graph_events import GraphEventStream
 from Graph.node import Node
+from Graph.path_index import PathScoreIndex
+from Graph.speculation import SpeculativeExpander
 from Prompts.prompts import *
+from Utils.metrics import pruned_nodes, cache_hits, discarded_tokens, expansion_latency, expansion_tokens, \
+    frontier_size, graph_nodes
+from Utils.utils import count_tokens
 
 
 class GraphManager:
@@ -16,7 +25,11 @@ class GraphManager:
     """
 
     def __init__(self, initial_prompt: str, generator: Generator, evaluator: Evaluator, parser: Parser,
-                 node_threshold: float, path_threshold: float, max_width: int, max_depth: int):
+                 node_threshold: float, path_threshold: float, max_width: int, max_depth: int,
+                 speculative_width: int = 0, speculative_token_budget: Optional[int] = None,
+                 speculative_strict: bool = False,
+                 parsed_data: Optional[Dict[str, str]] = None, event_stream: Optional[GraphEventStream] = None,
+                 prune_interval: int = 10, max_rejected_summaries: int = 100):
         """
         Initializes the GraphManager.
 
@@ -28,6 +41,13 @@ class GraphManager:
         :param path_threshold: A threshold score for validating the solution paths. Paths with scores above this threshold are considered valid solutions and stops the search.
         :param max_width: The maximum number of child nodes each node in the graph can have, controlling the breadth of exploration.
         :param max_depth: The maximum depth the graph can expand to, controlling the depth of exploration.
+        :param speculative_width: The number of predicted next expanded nodes whose generation is started in the background once the frontier is updated, running while the next leaves are checked and, beyond the first prediction, while the next nodes are expanded. 0 disables speculation.
+        :param speculative_token_budget: The maximum number of tokens that may be spent on speculative generations, unlimited if None.
+        :param speculative_strict: If True, a speculative generation is only used if all its inputs are unchanged, which rarely happens since each expansion adds rejected results. By default, a speculative chain is used even though it was generated without the results rejected since its launch.
+        :param parsed_data: The already parsed initial prompt. If None, the initial prompt is parsed with the parser.
+        :param event_stream: A GraphEventStream receiving the graph deltas during the search for live monitoring. It is flushed when solve or asolve finishes and stays open, so it can be reused. The caller closes it, otherwise it is closed at exit.
+        :param prune_interval: The number of search iterations between two pruning passes removing the subtrees that cannot contribute the solution anymore. 0 disables pruning.
+        :param max_rejected_summaries: The maximum number of rejected actions kept for the generator after a pruning pass.
         """
         self.initial_prompt = initial_prompt.strip()
 
@@ -39,14 +59,26 @@ class GraphManager:
         self.max_expand_depth = max_depth
         self.score_threshold = node_threshold
         self.path_threshold = path_threshold
-
-        self.parsed_data = self.parser.parse(data=self.initial_prompt,
-                                             output_format=output_formats['input_format'],
-                                             expected_keys=output_formats['input_expected_keys'])[0]
+        self.prune_interval = prune_interval
+        self.max_rejected_summaries = max_rejected_summaries
+
+        self.speculator = SpeculativeExpander(generator=self.generator, max_parallel=speculative_width,
+                                              token_budget=speculative_token_budget,
+                                              strict=speculative_strict) if speculative_width else None
+
+        if parsed_data is None:
+            try:
+                parsed_data = self.parser.parse(data=self.initial_prompt,
+                                                output_format=output_formats['input_format'],
+                                                expected_keys=output_formats['input_expected_keys'])[0]
+            except TokenBudgetExceeded as e:
+                print('<', '=' * 30, e)
+                parsed_data = self.unparsed_prompt_data(self.initial_prompt)
+        self.parsed_data = parsed_data
 
         self.root_node = Node(thought=self.parsed_data['Prior_Knowledge'],
                               action=self.parsed_data['Question'])
-        self.graph = Graph()
+        self.graph = Graph(event_stream=event_stream)
         self.graph.add_node(self.root_node)
 
         self.graph_dict = {self.root_node.id: self.root_node}
@@ -58,12 +90,39 @@ class GraphManager:
             'search': self.search
             # Other algorithms can be added here.
         }
+        self.async_algorithms: Dict[str, Callable[..., Awaitable[Optional[List[Node]]]]] = {
+            'search': self.asearch
+        }
 
-        self.potential_solutions = []
+        self.path_index = PathScoreIndex()
 
         self.tokens_count = 0
         self.final_answer = None
 
+    @classmethod
+    async def acreate(cls, initial_prompt: str, generator: Generator, evaluator: Evaluator, parser: Parser,
+                      **kwargs) -> 'GraphManager':
+        """
+        Creates a GraphManager, parsing the initial prompt without blocking the running event loop.
+        The keyword arguments are passed to the constructor.
+        """
+        try:
+            parsed_data = (await parser.aparse(data=initial_prompt.strip(),
+                                               output_format=output_formats['input_format'],
+                                               expected_keys=output_formats['input_expected_keys']))[0]
+        except TokenBudgetExceeded as e:
+            print('<', '=' * 30, e)
+            parsed_data = cls.unparsed_prompt_data(initial_prompt)
+
+        return cls(initial_prompt, generator, evaluator, parser, parsed_data=parsed_data, **kwargs)
+
+    @staticmethod
+    def unparsed_prompt_data(initial_prompt: str) -> Dict[str, str]:
+        """
+        Stands in for the parsed initial prompt when the parser has spent its token budget.
+        """
+        return {'Prior_Knowledge': initial_prompt.strip(), 'Question': initial_prompt.strip(), 'Domain': 'general'}
+
     def expand_node(self, node: Node):
         """
         Central function that coordinates interactions between the generator, parser, and evaluator agents to expand a given node.
@@ -71,34 +130,14 @@ class GraphManager:
 
         :param node: The node to be expanded.
         """
+        generation_inputs = self.start_expansion(node)
 
-        print(f'\n\n=====> Expanding {node} <=====')
-
-        # Create the state (reasoning path) for the generator
-        state, state_number, path = self.create_reasoning_path(node)
-
-        # Convert the visited solutions into a format suitable for the generator
-        frozen_state = {frozenset(d.items()) for d in path}
-        filtered_list = [f"- {d['Result']}\n" for d in self.visited if
-                         frozenset(d.items()) not in frozen_state]
-        visited_states_str = '\n'.join(
-            node for node in filtered_list) if filtered_list else 'There is no observations yet!'
-
-        print('-' * 100)
-        print('\n', visited_states_str, '\n')
-        print('-' * 100)
-        print('\n', state, '\n')
-        print('-' * 100)
-
-        # Generate new chain considering the state and rejected states
-        generated_chain = self.generator.generate(
-            initial_prompt=self.initial_prompt,
-            domain=self.parsed_data['Domain'],
-            reasoning_states=state,
-            rejected_actions=visited_states_str,
-            step_number=state_number + 1,
-            hint=f'Hint: {node.hint}' if node.hint else ''
-        )
+        # Generate new chain considering the state and rejected states, reusing a speculative generation if any
+        generated_chain = self.speculator.claim(node.id, generation_inputs) if self.speculator else None
+        if generated_chain is None:
+            generated_chain = self.generator.generate(**generation_inputs)
+        else:
+            cache_hits.inc(agent=self.generator.name)
 
         generated_chain = self.parser.filter_duplicate_thoughts(
             self.parser.parse_output(text=generated_chain,
@@ -109,46 +148,179 @@ class GraphManager:
         # Keep track of the last node in the chain
         node.is_leaf = False
         parent_node = node
-        loop_completed = True  # Flag to track if the loop completes without a break
 
-        for thought in generated_chain:
+        for position, thought in enumerate(generated_chain):
             child_node = Node(thought=thought['Thought'], action=thought['Action'], result=thought['Result'])
 
             child_state, _, _ = self.create_reasoning_path(node)
 
-            child_node_eval = self.evaluator.evaluate(input_data=self.initial_prompt, thought=child_node.as_string(),
-                                                      domain=self.parsed_data['Domain'],
-                                                      reasoning_states=child_state)
+            parsed_eval = self.evaluate_node(child_node, child_state)
 
-            parsed_eval = self.parser.parse_output(text=child_node_eval,
-                                                   output_format=output_formats['evaluation_format'],
-                                                   keys=output_formats['evaluation_expected_keys'])
+            # Stop processing further nodes if a node is below the threshold
+            if not self.attach_child(parent_node, child_node, parsed_eval):
+                self.record_discarded(generated_chain[position + 1:])
+                return
+            parent_node = child_node  # Update the last node in the chain
 
-            # print('\nDebugging:', parsed_eval, type(parsed_eval))
-            score = float(parsed_eval[0]['Final Score']) / 100
-            child_node.score = score
-            parent_node.hint = parsed_eval[0]['Hint']
+        # Set the is_leaf attribute only if the loop was completed
+        parent_node.is_leaf = True
 
-            self.visited.append(child_node.as_dict())
-            # Add the child node only if it meets the score threshold
-            if child_node.score >= self.score_threshold:
-                child_node.add_parent(parent_node)
-                parent_node.add_child(child_node)
+    async def aexpand_node(self, node: Node):
+        """
+        Asynchronous counterpart of expand_node, awaiting the agents on the running event loop.
+        Speculative generation is not used.
 
-                self.graph.add_node(child_node)
+        :param node: The node to be expanded.
+        """
+        generation_inputs = self.start_expansion(node)
 
-                self.graph_dict[parent_node.id] = parent_node  # .children.append(child_node)
-                self.graph_dict[child_node.id] = child_node  # []
+        generated_chain = await self.generator.agenerate(**generation_inputs)
 
-                parent_node = child_node  # Update the last node in the chain
-            else:
-                # self.rejected_solutions.append(child_node.as_string())
-                loop_completed = False  # Set the flag to False as the loop breaks here
-                break  # Stop processing further nodes if a node is below the threshold
+        generated_chain = self.parser.filter_duplicate_thoughts(
+            await self.parser.aparse_output(text=generated_chain,
+                                            output_format=output_formats['thoughts_format'],
+                                            keys=output_formats['thoughts_expected_keys'])
+        )
 
-        # Set the is_leaf attribute only if the loop was completed
-        if loop_completed:
-            parent_node.is_leaf = True
+        node.is_leaf = False
+        parent_node = node
+
+        for position, thought in enumerate(generated_chain):
+            child_node = Node(thought=thought['Thought'], action=thought['Action'], result=thought['Result'])
+
+            child_state, _, _ = self.create_reasoning_path(node)
+
+            parsed_eval = await self.aevaluate_node(child_node, child_state)
+
+            if not self.attach_child(parent_node, child_node, parsed_eval):
+                self.record_discarded(generated_chain[position + 1:])
+                return
+            parent_node = child_node
+
+        parent_node.is_leaf = True
+
+    def start_expansion(self, node: Node) -> dict:
+        """
+        Logs the expansion of the given node and creates its generator inputs.
+        """
+        print(f'\n\n=====> Expanding {node} <=====')
+
+        # Create the generator inputs from the reasoning path and the rejected states
+        generation_inputs = self.create_generation_inputs(node)
+
+        print('-' * 100)
+        print('\n', generation_inputs['rejected_actions'], '\n')
+        print('-' * 100)
+        print('\n', generation_inputs['reasoning_states'], '\n')
+        print('-' * 100)
+
+        return generation_inputs
+
+    def attach_child(self, parent_node: Node, child_node: Node, parsed_eval: List[Dict[str, Any]]) -> bool:
+        """
+        Scores the child node from its evaluation and attaches it to the parent node if it meets the score threshold.
+
+        :return: True if the child node was attached.
+        """
+        # print('\nDebugging:', parsed_eval, type(parsed_eval))
+        score = float(parsed_eval[0]['Final Score']) / 100
+        child_node.score = score
+        parent_node.hint = parsed_eval[0]['Hint']
+
+        self.visited.append(child_node.as_dict())
+        # Add the child node only if it meets the score threshold
+        if child_node.score < self.score_threshold:
+            # self.rejected_solutions.append(child_node.as_string())
+            pruned_nodes.inc(reason='threshold')
+            self.graph.mark_pruned(child_node, parent=parent_node)
+            return False
+
+        child_node.add_parent(parent_node)
+        parent_node.add_child(child_node)
+
+        self.graph.add_node(child_node)
+
+        self.graph_dict[parent_node.id] = parent_node  # .children.append(child_node)
+        self.graph_dict[child_node.id] = child_node  # []
+        self.path_index.add(child_node, self.evaluator.score_node_path(child_node))
+
+        return True
+
+    def evaluate_node(self, node: Node, reasoning_states: str) -> List[Dict[str, Any]]:
+        """
+        Evaluates a new node with the evaluator's scoring mode.
+
+        :return: The parsed evaluation, a list whose first entry holds the 'Final Score' (0 to 100) and 'Hint' keys.
+        """
+        evaluation_inputs = self.create_evaluation_inputs(node, reasoning_states)
+
+        if self.evaluator.scoring_mode == 'logprob':
+            return [self.evaluator.evaluate_with_logprobs(**evaluation_inputs)]
+        if self.evaluator.scoring_mode == 'self_consistency':
+            evaluation = self.evaluator.evaluate_with_samples(**evaluation_inputs)
+            if evaluation['Final Score'] is not None:
+                return [evaluation]
+            # None of the samples could be parsed, fall back to a single evaluation re-parsed by the parser
+
+        node_eval = self.evaluator.evaluate(**evaluation_inputs)
+
+        return self.parser.parse_output(text=node_eval,
+                                        output_format=output_formats['evaluation_format'],
+                                        keys=output_formats['evaluation_expected_keys'])
+
+    async def aevaluate_node(self, node: Node, reasoning_states: str) -> List[Dict[str, Any]]:
+        """
+        Asynchronous counterpart of evaluate_node.
+        """
+        evaluation_inputs = self.create_evaluation_inputs(node, reasoning_states)
+
+        if self.evaluator.scoring_mode == 'logprob':
+            return [await self.evaluator.aevaluate_with_logprobs(**evaluation_inputs)]
+        if self.evaluator.scoring_mode == 'self_consistency':
+            evaluation = await self.evaluator.aevaluate_with_samples(**evaluation_inputs)
+            if evaluation['Final Score'] is not None:
+                return [evaluation]
+            # None of the samples could be parsed, fall back to a single evaluation re-parsed by the parser
+
+        node_eval = await self.evaluator.aevaluate(**evaluation_inputs)
+
+        return await self.parser.aparse_output(text=node_eval,
+                                               output_format=output_formats['evaluation_format'],
+                                               keys=output_formats['evaluation_expected_keys'])
+
+    def create_evaluation_inputs(self, node: Node, reasoning_states: str) -> dict:
+        """
+        Creates the keyword arguments of Evaluator.evaluate for evaluating the given node.
+        The node threshold is passed with each call rather than set on the (possibly shared) evaluator.
+        """
+        return dict(input_data=self.initial_prompt, thought=node.as_string(),
+                    domain=self.parsed_data['Domain'], reasoning_states=reasoning_states,
+                    threshold=self.score_threshold)
+
+    def create_generation_inputs(self, node: Node) -> dict:
+        """
+        Creates the keyword arguments of Generator.generate for expanding the given node.
+        """
+        # Create the state (reasoning path) for the generator
+        state, state_number, path = self.create_reasoning_path(node)
+
+        # Convert the visited solutions into a format suitable for the generator
+        frozen_state = {frozenset(d.items()) for d in path}
+        filtered_list = [f"- {d['Result']}\n" for d in self.visited if
+                         frozenset(d.items()) not in frozen_state]
+        visited_states_str = '\n'.join(
+            node for node in filtered_list) if filtered_list else 'There is no observations yet!'
+
+        return {
+            'initial_prompt': self.initial_prompt,
+            'domain': self.parsed_data['Domain'],
+            'reasoning_states': state,
+            'rejected_actions': visited_states_str,
+            'step_number': state_number + 1,
+            # The node is expandable up to the maximum depth, so its chain may hold the steps up to one below it
+            'remaining_steps': self.max_expand_depth - node.depth + 1,
+            'hint': f'Hint: {node.hint}' if node.hint else ''
+        }
 
     def create_reasoning_path(self, node: Node) -> tuple[str, int, any]:
         """
@@ -187,21 +359,148 @@ class GraphManager:
         """
         algorithm = self.algorithms.get(search_algorithm)
         if algorithm:
-            self.expand_node(self.root_node)
-            optimal_solution = algorithm(*args, **kwargs)
-            final_answer = self.generator.generate_solution(init_problem=self.initial_prompt, path=optimal_solution)
+            try:
+                try:
+                    self.expand_node(self.root_node)
+                    optimal_solution = algorithm(*args, **kwargs)
+                except TokenBudgetExceeded as e:
+                    # The budget is spent before the search starts, answer from the best path found so far
+                    print('<', '=' * 30, e)
+                    optimal_solution = self.select_best_solution()
+                final_answer = self.generator.generate_solution(init_problem=self.initial_prompt,
+                                                                path=optimal_solution)
+            finally:
+                self.flush_event_stream()
+
+            self.tokens_count = self.agents_tokens_count()
 
-            self.tokens_count = self.generator.tokens_count + self.evaluator.tokens_count + self.parser.tokens_count
+            return final_answer
+        else:
+            raise ValueError(f"Search algorithm '{search_algorithm}' is not supported.")
+
+    async def asolve(self, search_algorithm: str, *args, **kwargs) -> Optional[List[Any]]:
+        """
+        Asynchronous counterpart of solve. All agent calls are awaited on the running event loop,
+        so many problems can be solved concurrently in one process. Cancelling the task cancels the
+        in-flight LLM call and leaves the graph as built so far.
+        """
+        algorithm = self.async_algorithms.get(search_algorithm)
+        if algorithm:
+            try:
+                try:
+                    await self.aexpand_node(self.root_node)
+                    optimal_solution = await algorithm(*args, **kwargs)
+                except TokenBudgetExceeded as e:
+                    print('<', '=' * 30, e)
+                    optimal_solution = self.select_best_solution()
+                final_answer = await self.generator.agenerate_solution(init_problem=self.initial_prompt,
+                                                                       path=optimal_solution)
+            finally:
+                self.flush_event_stream()
+
+            self.tokens_count = self.agents_tokens_count()
 
             return final_answer
         else:
             raise ValueError(f"Search algorithm '{search_algorithm}' is not supported.")
 
+    def flush_event_stream(self):
+        """
+        Waits until the pending graph events are written to the event stream, if any.
+        """
+        if self.graph.event_stream:
+            self.graph.event_stream.flush()
+
     def search(self, iteration_limit=50, down_up=True):
         """
         Searches the graph using a priority queue-based approach to find the solution.
         """
+        node_queue, enqueue_nodes, enqueued_nodes = self.create_frontier(down_up)
+        if self.speculator:
+            self.speculate(node_queue)
+
+        for iteration in range(1, iteration_limit + 1):
+
+            if node_queue.empty():
+                break
+
+            _, current_node_id = node_queue.get()
+            # print('=' * 50, current_node_id)
+            current_node = self.graph_dict[current_node_id]
+
+            # Return solution path if a valid leaf node is found
+            if current_node.is_leaf:
+                if self.accept_leaf(current_node):
+                    if self.speculator:
+                        self.speculator.shutdown()
+                    return self.final_answer
+
+            elif self.is_expandable(current_node):
+                # Expand the current node if conditions are met and enqueue new nodes
+                start, tokens_count = time.perf_counter(), self.agents_tokens_count()
+                try:
+                    self.expand_node(current_node)
+                except TokenBudgetExceeded as e:
+                    # An agent has spent its token budget, stop with the best path found so far
+                    print('<', '=' * 30, e)
+                    break
+                self.record_expansion(current_node, start, tokens_count)
+                enqueue_nodes()
+                self.record_frontier(node_queue)
+
+                # Start generating for the nodes most likely to be expanded next from the updated frontier
+                if self.speculator:
+                    self.speculate(node_queue)
+
+            # Periodically drop the subtrees that cannot contribute the solution anymore
+            if self.prune_interval and iteration % self.prune_interval == 0:
+                self.prune(node_queue, enqueued_nodes)
+
+        if self.speculator:
+            self.speculator.shutdown()
+
+        return self.select_best_solution()
+
+    async def asearch(self, iteration_limit=50, down_up=True):
+        """
+        Asynchronous counterpart of search.
+        """
+        node_queue, enqueue_nodes, enqueued_nodes = self.create_frontier(down_up)
+
+        for iteration in range(1, iteration_limit + 1):
 
+            if node_queue.empty():
+                break
+
+            _, current_node_id = node_queue.get()
+            current_node = self.graph_dict[current_node_id]
+
+            if current_node.is_leaf:
+                if self.accept_leaf(current_node):
+                    return self.final_answer
+
+            elif self.is_expandable(current_node):
+                start, tokens_count = time.perf_counter(), self.agents_tokens_count()
+                try:
+                    await self.aexpand_node(current_node)
+                except TokenBudgetExceeded as e:
+                    print('<', '=' * 30, e)
+                    break
+                self.record_expansion(current_node, start, tokens_count)
+                enqueue_nodes()
+                self.record_frontier(node_queue)
+
+            # Periodically drop the subtrees that cannot contribute the solution anymore
+            if self.prune_interval and iteration % self.prune_interval == 0:
+                self.prune(node_queue, enqueued_nodes)
+
+        return self.select_best_solution()
+
+    def create_frontier(self, down_up: bool) -> Tuple[PriorityQueue, Callable[[], None], set]:
+        """
+        Creates the priority queue of the search, the function enqueueing the nodes that can still be expanded
+        and the set of the nodes that are no longer enqueued.
+        """
         # Initialize a priority queue for nodes and a set to track enqueued nodes
         node_queue = PriorityQueue()
         enqueued_nodes = set()
@@ -213,57 +512,144 @@ class GraphManager:
                     priority = -node_data['depth'] if down_up else node_data['depth']
                     node_queue.put((priority, node_id))
                 # if the node reached the max children number
-                if len(self.graph_dict[node_id].children) >= self.max_width:
+                if self.graph_dict[node_id].width >= self.max_width:
                     enqueued_nodes.add(node_id)
 
         # Initial enqueue of expandable nodes
         enqueue_nodes()
 
-        # Helper function to enqueue nodes with certain conditions
-        # def enqueue_nodes():
-        #     for node_id, node_data in self.graph.graph.nodes(data=True):
-        #         if node_data['depth'] <= self.max_expand_depth and node_id not in enqueued_nodes:
-        #             priority = -node_data['depth'] if down_up else node_data['depth']
-        #             node_queue.put((priority, node_id))
-        #             if len(self.graph_dict[node_id].children) >= self.max_width:
-        #                 enqueued_nodes.add(node_id)
+        return node_queue, enqueue_nodes, enqueued_nodes
 
-        for _ in range(iteration_limit):
+    def prune(self, node_queue: PriorityQueue, enqueued_nodes: set):
+        """
+        Removes the subtrees whose best possible path score cannot beat the current best path score,
+        either because their paths are exhausted or because no extension can reach it.
+        The rejected actions are compacted on every pass, whether or not a subtree is pruned.
+        """
+        self.compact_visited()
+
+        _, best_score = self.path_index.best()
+        if best_score is None:
+            return
+
+        # Bound the best path score reachable in each subtree, children before parents
+        order, stack = [], [self.root_node]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children)
+
+        bounds = {}
+        for node in reversed(order):
+            if not node.is_leaf and self.is_expandable(node):
+                bound = self.evaluator.score_extension_bound(node)
+            elif not node.children:
+                bound = self.evaluator.score_node_path(node)
+            else:
+                bound = -math.inf
+            bounds[node.id] = max([bound] + [bounds[child.id] for child in node.children])
+
+        pruned_ids = set()
+        for node in order:
+            if node.parent is None or node.parent.id in pruned_ids or bounds[node.id] >= best_score:
+                continue
+            node.parent.remove_child(node)
+            stack = [node]
+            while stack:
+                pruned_node = stack.pop()
+                pruned_ids.add(pruned_node.id)
+                stack.extend(pruned_node.children)
+
+        if not pruned_ids:
+            return
+
+        for node_id in pruned_ids:
+            node = self.graph_dict.pop(node_id)
+            self.graph.remove_node(node)
+            enqueued_nodes.discard(node_id)
+        self.path_index.remove(pruned_ids)
+        pruned_nodes.inc(len(pruned_ids), reason='subtree')
+
+        # Drop the pruned and duplicated entries of the frontier
+        with node_queue.mutex:
+            node_queue.queue[:] = sorted({entry for entry in node_queue.queue if entry[1] not in pruned_ids})
+
+    def compact_visited(self):
+        """
+        Keeps one compact summary per rejected result, the most recent ones only.
+        """
+        summaries = {}
+        for visited_state in self.visited:
+            summaries.pop(visited_state['Result'], None)
+            summaries[visited_state['Result']] = visited_state
+        self.visited = list(summaries.values())[-self.max_rejected_summaries:]
 
-            if node_queue.empty():
-                break
+    def agents_tokens_count(self) -> int:
+        return self.generator.tokens_count + self.evaluator.tokens_count + self.parser.tokens_count
 
-            _, current_node_id = node_queue.get()
-            # print('=' * 50, current_node_id)
-            current_node = self.graph_dict[current_node_id]
+    def record_expansion(self, node: Node, start: float, tokens_count: int):
+        """
+        Records the latency and the output tokens of the expansion of the given node, started at start
+        when the agents had counted tokens_count tokens.
+        """
+        expansion_latency.observe(time.perf_counter() - start, depth=node.depth)
+        expansion_tokens.observe(self.agents_tokens_count() - tokens_count, depth=node.depth)
 
-            # Return solution path if a valid leaf node is found
-            if current_node.is_leaf:
-                potential_solution_path = self.create_solution_path(current_node)
-                path_score = self.evaluator.evaluate_path(potential_solution_path)
-                if path_score > self.path_threshold:
-                    self.final_answer = potential_solution_path
-                    self.graph.highlight_solution(self.final_answer)
-                    return potential_solution_path
-                else:
-                    self.potential_solutions.append((potential_solution_path, path_score))
-
-            elif current_node.depth <= self.max_expand_depth and len(current_node.children) < self.max_width:
-                # Expand the current node if conditions are met and enqueue new nodes
-                self.expand_node(current_node)
-                enqueue_nodes()
+    def record_discarded(self, thoughts: List[Dict[str, str]]):
+        """
+        Records the generated tokens of the thoughts discarded after the chain was truncated.
+        """
+        if thoughts:
+            text = '\n'.join(f"Thought: {t['Thought']}\nAction: {t['Action']}\nResult: {t['Result']}" for t in thoughts)
+            discarded_tokens.inc(count_tokens(text=text), agent=self.generator.name)
+
+    def record_frontier(self, node_queue: PriorityQueue):
+        frontier_size.set(node_queue.qsize())
+        graph_nodes.set(len(self.graph_dict))
+
+    def is_expandable(self, node: Node) -> bool:
+        return node.depth <= self.max_expand_depth and node.width < self.max_width
 
-        for i, n in self.graph_dict.items():
-            if len(n.children) < 1:
-                potential_solution_path = self.create_solution_path(n)
-                path_score = self.evaluator.evaluate_path(potential_solution_path)
-                self.potential_solutions.append((potential_solution_path, path_score))
+    def accept_leaf(self, node: Node) -> bool:
+        """
+        Accepts the path ending at the given leaf as final answer if its score is above the path threshold.
+        Otherwise the leaf stays a candidate of the path index for the final best path selection.
+        """
+        if self.evaluator.score_node_path(node) > self.path_threshold:
+            self.final_answer = self.create_solution_path(node)
+            self.graph.highlight_solution(self.final_answer)
+            return True
+
+        return False
 
-        # If no valid solution path is found return the path with highest score.
-        self.final_answer = max(self.potential_solutions, key=lambda x: x[1])[0]
+    def select_best_solution(self) -> list:
+        """
+        Selects the path with the highest score if no valid solution path is found.
+        """
+        best_node, _ = self.path_index.best()
+        self.final_answer = self.create_solution_path(best_node if best_node is not None else self.root_node)
         self.graph.highlight_solution(self.final_answer)
         return self.final_answer
 
+    def speculate(self, node_queue: PriorityQueue):
+        """
+        Predicts the next expanded nodes in the pop order of the frontier, skipping the leaves and the nodes
+        that cannot be expanded, and starts their generation in the background.
+        Speculations on nodes that are no longer predicted are discarded.
+        """
+        predicted = []
+        # The frontier holds duplicated entries until the next pruning pass
+        for _, node_id in sorted(set(node_queue.queue)):
+            if len(predicted) == self.speculator.max_parallel:
+                break
+            node = self.graph_dict[node_id]
+            if node_id not in predicted and not node.is_leaf and self.is_expandable(node):
+                predicted.append(node_id)
+
+        self.speculator.retain(predicted)
+        for node_id in predicted:
+            self.speculator.speculate(node_id, self.create_generation_inputs(self.graph_dict[node_id]))
+
     def create_solution_path(self, node: Node) -> list:
         """
         """
@@ -1,3 +1,6 @@
+import math
+
+
 class Node:
     def __init__(self, node_id: int = None, thought: str = None, action: str = None, result: str = None,
                  score: float = None, hint: str = ''):
@@ -9,9 +12,17 @@ class Node:
         self.hint = hint
         self.parent = None
         self.children = []
+        self.pruned_children = 0
         self.depth = 0
         self.is_leaf = False
 
+        # Running aggregates of the scores along the path root -> self (root excluded),
+        # maintained incrementally when the node is attached to its parent.
+        self.path_sum = 0.0
+        self.path_count = 0
+        self.path_min = math.inf
+        self.path_log_sum = 0.0
+
     _next_id_counter = 1
 
     @classmethod
@@ -23,10 +34,35 @@ class Node:
     def add_parent(self, parent_node):
         self.parent = parent_node
         self.depth = self.parent.depth + 1
+        self.update_path_aggregates()
+
+    def update_path_aggregates(self):
+        """
+        Derives the path aggregates of this node from its parent's aggregates and its own score.
+        """
+        parent = self.parent
+        if parent is None or self.score is None:
+            return
+
+        self.path_sum = parent.path_sum + self.score
+        self.path_count = parent.path_count + 1
+        self.path_min = min(parent.path_min, self.score)
+        self.path_log_sum = parent.path_log_sum + (math.log(self.score) if self.score > 0 else -math.inf)
 
     def add_child(self, child_node):
         self.children.append(child_node)
 
+    def remove_child(self, child_node):
+        self.children.remove(child_node)
+        self.pruned_children += 1
+
+    @property
+    def width(self):
+        """
+        The number of children attached to this node, including the pruned ones.
+        """
+        return len(self.children) + self.pruned_children
+
     def as_dict(self):
         return {
             "Thought": self.thought,
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class PathScoreIndex:
+    """
+    Array-backed index of the path scores of all attached nodes, used to select the best
+    solution path with a single vectorised arg-max instead of re-walking every leaf path.
+    """
+
+    def __init__(self, capacity=256):
+        self.nodes = []
+        self.positions = {}
+        self.scores = np.full(capacity, -np.inf)
+        self.terminal = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _grow(self):
+        capacity = 2 * len(self.scores)
+        scores = np.full(capacity, -np.inf)
+        scores[:len(self.nodes)] = self.scores[:len(self.nodes)]
+        terminal = np.zeros(capacity, dtype=bool)
+        terminal[:len(self.nodes)] = self.terminal[:len(self.nodes)]
+        self.scores, self.terminal = scores, terminal
+
+    def add(self, node, path_score):
+        """
+        Records the path score of a newly attached node and marks its parent as non-terminal.
+        """
+        if len(self.nodes) == len(self.scores):
+            self._grow()
+
+        position = len(self.nodes)
+        self.nodes.append(node)
+        self.positions[node.id] = position
+        self.scores[position] = path_score
+        self.terminal[position] = True
+
+        if node.parent is not None and node.parent.id in self.positions:
+            self.terminal[self.positions[node.parent.id]] = False
+
+    def remove(self, node_ids):
+        """
+        Removes the given nodes, already detached from their parents, and compacts the arrays.
+        The parents left without children end a path again and become terminal.
+        """
+        parents = [node.parent for node in self.nodes if node.id in node_ids and node.parent is not None]
+        kept = [position for position, node in enumerate(self.nodes) if node.id not in node_ids]
+        count = len(kept)
+
+        self.nodes = [self.nodes[position] for position in kept]
+        self.positions = {node.id: position for position, node in enumerate(self.nodes)}
+        self.scores[:count] = self.scores[kept]
+        self.scores[count:] = -np.inf
+        self.terminal[:count] = self.terminal[kept]
+        self.terminal[count:] = False
+
+        for parent in parents:
+            if not parent.children and parent.id in self.positions:
+                self.terminal[self.positions[parent.id]] = True
+
+    def best(self):
+        """
+        :return: The terminal node with the highest path score and its score, or (None, None) if empty.
+        """
+        count = len(self.nodes)
+        if not count:
+            return None, None
+
+        candidates = np.where(self.terminal[:count], self.scores[:count], -np.inf)
+        position = int(np.argmax(candidates))
+        if candidates[position] == -np.inf:
+            return None, None
+        return self.nodes[position], float(candidates[position])
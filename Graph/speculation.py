@@ -0,0 +1,124 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from Agents.generator import Generator
+
+
+class SpeculativeExpander:
+    """
+    Runs Generator.generate in the background for frontier nodes that are predicted to be expanded next,
+    so the LLM backend keeps working while the search pops the frontier and checks its leaves.
+    """
+
+    def __init__(self, generator: Generator, max_parallel: int = 1, token_budget: Optional[int] = None,
+                 strict: bool = False):
+        """
+        :param generator: The Generator instance used for the speculative generations.
+        :param max_parallel: The maximum number of speculative generations kept at once.
+        :param token_budget: The maximum number of tokens spent on speculative generations, unlimited if None.
+        :param strict: If True, a speculation is only used when all its generation inputs are unchanged.
+            Otherwise, changes of the rejected actions since the launch are tolerated: the used chain may have
+            been generated without the results rejected by the expansions that ran meanwhile.
+        """
+        self.generator = generator
+        self.max_parallel = max_parallel
+        self.token_budget = token_budget
+        self.strict = strict
+
+        self.executor = None
+        self.pending: Dict[str, tuple] = {}
+        # The token counts are updated from the worker threads
+        self._lock = threading.Lock()
+
+        self.launched = 0
+        self.hits = 0
+        self.discarded = 0
+        self.spent_tokens = 0
+        self.wasted_tokens = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.launched if self.launched else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'launched': self.launched,
+            'hits': self.hits,
+            'discarded': self.discarded,
+            'hit_rate': self.hit_rate,
+            'spent_tokens': self.spent_tokens,
+            'wasted_tokens': self.wasted_tokens,
+        }
+
+    def _budget_exhausted(self) -> bool:
+        return self.token_budget is not None and self.spent_tokens >= self.token_budget
+
+    def _matches(self, launched_inputs: dict, inputs: dict) -> bool:
+        if self.strict:
+            return launched_inputs == inputs
+        return all(launched_inputs[key] == value for key, value in inputs.items() if key != 'rejected_actions')
+
+    def _generate(self, inputs: dict) -> tuple:
+        result, tokens = self.generator.generate_counted(**inputs)
+        with self._lock:
+            self.spent_tokens += tokens
+        return result, tokens
+
+    def speculate(self, node_id: str, inputs: dict):
+        """
+        Starts the generation for the given node in the background, unless it is already pending,
+        the maximum number of speculations is reached or the token budget is exhausted.
+        """
+        if node_id in self.pending or len(self.pending) >= self.max_parallel or self._budget_exhausted():
+            return
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='goat-speculation')
+        self.pending[node_id] = (inputs, self.executor.submit(self._generate, inputs))
+        self.launched += 1
+
+    def claim(self, node_id: str, inputs: dict) -> Optional[str]:
+        """
+        Returns the speculative generation of the given node if the prediction was right, otherwise None.
+        """
+        if node_id not in self.pending:
+            return None
+
+        launched_inputs, future = self.pending.pop(node_id)
+        if not self._matches(launched_inputs, inputs):
+            self._discard(future)
+            return None
+
+        self.hits += 1
+        return future.result()[0]
+
+    def retain(self, node_ids: List[str]):
+        """
+        Discards all pending speculations except those of the given nodes.
+        """
+        for node_id in [node_id for node_id in self.pending if node_id not in node_ids]:
+            _, future = self.pending.pop(node_id)
+            self._discard(future)
+
+    def shutdown(self):
+        """
+        Discards all pending speculations and waits for the running ones, so their tokens are counted
+        by the generator before the search reports its token count.
+        """
+        self.retain([])
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def _discard(self, future):
+        self.discarded += 1
+        if future.cancel():
+            return
+
+        def count_wasted(done_future):
+            if not done_future.cancelled() and done_future.exception() is None:
+                with self._lock:
+                    self.wasted_tokens += done_future.result()[1]
+
+        future.add_done_callback(count_wasted)
@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+
+from Agents.client_registry import client_registry
+from Agents.evaluator import Evaluator
+from Agents.generator import Generator
+from Agents.parser import Parser
+from Graph.graph_manager import GraphManager
+
+DEFAULT_JOB_CONFIG = {
+    'algorithm': 'search',
+    'node_threshold': 0.5,
+    'path_threshold': 0.7,
+    'max_width': 3,
+    'max_depth': 5,
+    'iteration_limit': 50,
+    'down_up': True,
+}
+
+SEARCH_KEYS = ['iteration_limit', 'down_up']
+MANAGER_KEYS = ['node_threshold', 'path_threshold', 'max_width', 'max_depth']
+
+
+class SolveWorker:
+    """
+    A worker owning a warm set of agents, reused by all the jobs it runs.
+    """
+
+    def __init__(self, worker_id, model_parameters):
+        self.worker_id = worker_id
+        self.generator = Generator(**model_parameters)
+        self.evaluator = Evaluator(**model_parameters)
+        self.parser = Parser(**model_parameters)
+
+    def tokens_count(self):
+        return self.generator.tokens_count + self.evaluator.tokens_count + self.parser.tokens_count
+
+    async def run(self, job):
+        config = {**DEFAULT_JOB_CONFIG, **job.get('config', {})}
+        tokens_count, start = self.tokens_count(), time.perf_counter()
+
+        graph_manager = await GraphManager.acreate(job['prompt'], self.generator, self.evaluator, self.parser,
+                                                   **{key: config[key] for key in MANAGER_KEYS})
+        answer = await graph_manager.asolve(config['algorithm'], **{key: config[key] for key in SEARCH_KEYS})
+
+        return {
+            'id': job.get('id'),
+            'status': 'done',
+            'worker': self.worker_id,
+            'answer': answer,
+            'solution_path': [node.as_dict() for node in graph_manager.final_answer[1:]],
+            'tokens_count': self.tokens_count() - tokens_count,
+            'elapsed': time.perf_counter() - start,
+        }
+
+
+class SolveService:
+    """
+    A long-running solve service: jobs are queued and run by a pool of workers with warm agents,
+    and each result is written as one JSON line as soon as its job finishes.
+    """
+
+    def __init__(self, model_parameters, workers=4, output=None):
+        """
+        :param model_parameters: The LLM parameters of the agents.
+        :param workers: The number of workers, each running one job at a time.
+        :param output: The stream the results are written to, stdout if None.
+        """
+        self.workers = [SolveWorker(worker_id, model_parameters) for worker_id in range(workers)]
+        self.output = output or sys.stdout
+        # Created in serve, inside the running event loop the queue binds to on Python < 3.10
+        self.jobs = None
+
+    def emit(self, result):
+        self.output.write(json.dumps(result) + '\n')
+        self.output.flush()
+
+    async def work(self, worker):
+        while True:
+            job = await self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            job_id = job.get('id')
+            try:
+                self.emit(await worker.run(job))
+            except Exception as e:
+                self.emit({'id': job_id, 'status': 'error', 'error': repr(e)})
+            finally:
+                self.jobs.task_done()
+
+    @staticmethod
+    def validate_job(job):
+        """
+        :return: The reason the job cannot be run, or None if it is valid.
+        """
+        if not isinstance(job, dict):
+            return f'Invalid job: expected a JSON object, got {type(job).__name__}'
+        if not isinstance(job.get('prompt'), str):
+            return "Invalid job: missing 'prompt'"
+        if not isinstance(job.get('config', {}), dict):
+            return "Invalid job: 'config' must be a JSON object"
+        return None
+
+    async def submit(self, job):
+        await self.jobs.put(job)
+
+    async def serve(self, lines):
+        """
+        Runs the jobs read from an iterator of JSON lines until it is exhausted.
+        Each job holds an 'id', a 'prompt' and an optional 'config' overriding DEFAULT_JOB_CONFIG.
+        """
+        self.jobs = asyncio.Queue()
+        tasks = [asyncio.create_task(self.work(worker)) for worker in self.workers]
+        loop = asyncio.get_running_loop()
+
+        while True:
+            line = await loop.run_in_executor(None, lines.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.emit({'status': 'error', 'error': f'Invalid job: {e}'})
+                continue
+
+            error = self.validate_job(job)
+            if error:
+                self.emit({'id': job.get('id') if isinstance(job, dict) else None, 'status': 'error', 'error': error})
+            else:
+                await self.submit(job)
+
+        for _ in tasks:
+            await self.jobs.put(None)
+        await asyncio.gather(*tasks)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Run GoAT solve jobs read as JSON lines from stdin.')
+    argument_parser.add_argument('--model-name', required=True)
+    argument_parser.add_argument('--base-url', default=None)
+    argument_parser.add_argument('--api-key', default=os.environ.get('OPENAI_API_KEY'))
+    argument_parser.add_argument('--temperature', type=float, default=0)
+    argument_parser.add_argument('--max-tokens', type=int, default=0)
+    argument_parser.add_argument('--workers', type=int, default=4)
+    args = argument_parser.parse_args()
+
+    model_parameters = {
+        'model_name': args.model_name,
+        'base_url': args.base_url,
+        'api_key': args.api_key,
+        'temperature': args.temperature,
+        'max_tokens': args.max_tokens,
+    }
+
+    # Keep stdout for the results, the agents' progress logs go to stderr
+    output = sys.stdout
+
+    async def serve():
+        try:
+            await SolveService(model_parameters, workers=args.workers, output=output).serve(sys.stdin)
+        finally:
+            # Close the pooled connections on the event loop they were opened on
+            await client_registry.aclose()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DEFAULT_TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def expose(self):
+        with self._lock:
+            values = list(self.values.items())
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        lines += [f'{self.name}{_format_labels(key)} {value}' for key, value in values]
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = value
+
+    def expose(self):
+        with self._lock:
+            values = list(self.values.items())
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        lines += [f'{self.name}{_format_labels(key)} {value}' for key, value in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.values.get(key)
+            if series is None:
+                # Per bucket counts followed by the +Inf count, the sum and the count of the observations
+                series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[bucket] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def expose(self):
+        # Copy the series so they are consistent and can be updated while they are formatted
+        with self._lock:
+            values = [(key, list(series)) for key, series in self.values.items()]
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for key, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", bound),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {series[-2]}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {series[-1]}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    A registry of counters, gauges and histograms updated from the agents and the search loop,
+    exported in the Prometheus text format. Updates are dictionary operations under a per metric lock,
+    so the overhead on the hot path is negligible and the metrics can be exposed from another thread.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.server = None
+
+    def _register(self, metric):
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation):
+        return self._register(Counter(name, documentation))
+
+    def gauge(self, name, documentation):
+        return self._register(Gauge(name, documentation))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, buckets))
+
+    def to_prometheus(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines += metric.expose()
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Writes the metrics to a file atomically, e.g. for the textfile collector of the node exporter.
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(temporary_path, path)
+
+    def serve(self, port=9100, host='127.0.0.1'):
+        """
+        Serves the metrics on http://host:port/metrics from a daemon thread.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+
+metrics = MetricsRegistry()
+
+llm_calls = metrics.counter('goat_llm_calls_total', 'LLM calls per agent.')
+llm_latency = metrics.histogram('goat_llm_latency_seconds', 'LLM call latency per agent.')
+llm_tokens = metrics.histogram('goat_llm_output_tokens', 'LLM output tokens per call and agent.',
+                               buckets=DEFAULT_TOKEN_BUCKETS)
+reparses = metrics.counter('goat_reparses_total', 'Outputs that could not be parsed and were re-parsed.')
+pruned_nodes = metrics.counter('goat_pruned_nodes_total',
+                               'Nodes rejected below the node threshold or pruned with their subtree.')
+discarded_tokens = metrics.counter('goat_discarded_tokens_total',
+                                   'Generated tokens discarded after the chain was truncated.')
+cache_hits = metrics.counter('goat_cache_hits_total', 'Speculative generations used for an expansion.')
+expansion_latency = metrics.histogram('goat_expansion_latency_seconds', 'Node expansion latency per depth.')
+expansion_tokens = metrics.histogram('goat_expansion_output_tokens', 'LLM output tokens per expansion and depth.',
+                                     buckets=DEFAULT_TOKEN_BUCKETS)
+frontier_size = metrics.gauge('goat_frontier_size', 'Entries in the search priority queue.')
+graph_nodes = metrics.gauge('goat_graph_nodes', 'Nodes in the thought graph.')
+http_requests = metrics.counter('goat_http_requests_total', 'HTTP requests per pooled client.')
+http_in_flight = metrics.gauge('goat_http_in_flight', 'HTTP requests in flight per pooled client.')
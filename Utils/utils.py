@@ -1,4 +1,5 @@
 import ast
+import functools
 import os
 import json
 import re
@@ -77,9 +78,15 @@ def extract_and_validate(text, expected_keys, is_list=False):
     return None
 
 
+@functools.lru_cache(maxsize=None)
+def load_tokenizer(model_name):
+    # Load each tokenizer once per process
+    return AutoTokenizer.from_pretrained(model_name)
+
+
 def count_tokens(text, model_name="mlabonne/Beagle14-7B"):
     # Initialize the tokenizer with the specified model
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer = load_tokenizer(model_name)
 
     # Tokenize the input text and count the tokens
     input_ids = tokenizer.encode(text, add_special_tokens=True)
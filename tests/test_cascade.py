@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip('langchain_core')
+pytest.importorskip('transformers')
+
+from Agents.cascade import CascadeEvaluator
+from Agents.evaluator import Evaluator
+
+
+class SampledEvaluator:
+    scoring_mode = 'self_consistency'
+    max_variance = 0.02
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def evaluate_with_samples(self, **evaluation_inputs):
+        self.calls += 1
+        return self.result
+
+
+def test_unparsed_samples_have_no_score():
+    evaluator = Evaluator.__new__(Evaluator)
+
+    assert evaluator._aggregate_samples([]) == {'Final Score': None, 'Hint': '', 'Variance': None}
+
+
+def test_cascade_escalates_unparsed_samples():
+    small = SampledEvaluator({'Final Score': None, 'Hint': '', 'Variance': None})
+    large = SampledEvaluator({'Final Score': 80.0, 'Hint': '', 'Variance': 0.0})
+    cascade = CascadeEvaluator(small, large)
+
+    assert cascade.evaluate_with_samples(threshold=0.5)['Final Score'] == 80.0
+    assert (small.calls, large.calls) == (1, 1)
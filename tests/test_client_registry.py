@@ -0,0 +1,83 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('openai')
+
+from Agents.client_registry import PooledClient
+
+
+class ChatCompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps({
+            'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'local',
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': '5'}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ChatCompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/v1'
+    server.shutdown()
+
+
+def complete(client):
+    return client.chat.completions.create(model='local', messages=[{'role': 'user', 'content': '2 + 3?'}])
+
+
+def test_async_client_is_reusable_across_event_loops_and_closes(base_url):
+    pooled_client = PooledClient('local', base_url=base_url, api_key='key')
+
+    # Each asyncio.run opens its connections on a new event loop and closes that loop
+    for _ in range(2):
+        response = asyncio.run(complete(pooled_client.async_client))
+        assert response.choices[0].message.content == '5'
+    assert complete(pooled_client.client).choices[0].message.content == '5'
+
+    assert pooled_client.stats()['requests'] == 3
+    assert pooled_client.in_flight == 0
+    pooled_client.close()
+
+
+def test_failed_requests_are_no_longer_in_flight():
+    pooled_client = PooledClient('local', base_url='http://127.0.0.1:1/v1', api_key='key')
+    pooled_client.client = pooled_client.client.with_options(max_retries=0)
+    pooled_client.async_client = pooled_client.async_client.with_options(max_retries=0)
+
+    with pytest.raises(Exception):
+        complete(pooled_client.client)
+    with pytest.raises(Exception):
+        asyncio.run(complete(pooled_client.async_client))
+
+    assert pooled_client.requests == 2
+    assert pooled_client.in_flight == 0
+    pooled_client.close()
+
+
+def test_aclose_closes_the_pool_of_the_running_loop(base_url):
+    pooled_client = PooledClient('local', base_url=base_url, api_key='key')
+
+    async def run():
+        await complete(pooled_client.async_client)
+        assert pooled_client.stats()['async_pool']['connections'] == 1
+        await pooled_client.aclose()
+        assert pooled_client.async_transport.transports == {}
+
+    asyncio.run(run())
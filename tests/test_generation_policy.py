@@ -0,0 +1,26 @@
+import pytest
+
+from Agents.generation_policy import GenerationPolicy, TokenBudgetExceeded
+
+
+def test_steps_are_capped_by_the_steps_left_before_the_maximum_depth():
+    policy = GenerationPolicy(max_steps=3, tokens_per_step=100)
+
+    assert policy.call_parameters(tokens_count=0, step_number=2, remaining_steps=5) == {
+        'stop': ['Step 5', "'Step': 5"], 'max_tokens': 300}
+    assert policy.call_parameters(tokens_count=0, step_number=4, remaining_steps=1) == {
+        'stop': ['Step 5', "'Step': 5"], 'max_tokens': 100}
+
+
+def test_calls_without_steps_are_not_step_limited():
+    policy = GenerationPolicy(max_steps=3, tokens_per_step=100, max_tokens=500)
+
+    assert policy.call_parameters(tokens_count=0) == {'max_tokens': 500}
+
+
+def test_spent_budget_raises():
+    policy = GenerationPolicy(token_budget=1000)
+
+    assert policy.call_parameters(tokens_count=900) == {'max_tokens': 100}
+    with pytest.raises(TokenBudgetExceeded):
+        policy.call_parameters(tokens_count=1000)
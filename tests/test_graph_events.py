@@ -0,0 +1,65 @@
+import pytest
+
+from Graph.graph_events import GraphEventStream
+
+
+def read_events(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_flush_writes_the_pending_events_and_keeps_the_stream_open(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    stream = GraphEventStream(path, flush_interval=60)
+
+    stream.emit('node_added', id='node_1')
+    stream.flush()
+    assert len(read_events(path)) == 1
+
+    stream.emit('node_added', id='node_2')
+    stream.close()
+    stream.close()
+    assert len(read_events(path)) == 2
+
+
+def test_emit_on_a_closed_stream_raises(tmp_path):
+    stream = GraphEventStream(str(tmp_path / 'events.jsonl'))
+    stream.close()
+
+    with pytest.raises(ValueError):
+        stream.emit('node_added', id='node_1')
+
+
+def test_a_stream_can_be_reused_by_several_solves(tmp_path):
+    pytest.importorskip('numpy')
+    pytest.importorskip('networkx')
+    pytest.importorskip('langchain')
+    pytest.importorskip('transformers')
+    from Agents.evaluator import Evaluator
+    from Agents.fake_llm import ScriptedChatModel
+    from Agents.generator import Generator
+    from Agents.parser import Parser
+    from Graph.graph_manager import GraphManager
+
+    def respond(prompt):
+        if 'Evaluate this step' in prompt:
+            return "'Final Score': 80\n'Hint': none"
+        if 'synthesize' in prompt:
+            return 'The answer is 5.'
+        return 'Thought: add the numbers\nAction: 2 + 3\nResult: 5'
+
+    chat_model = ScriptedChatModel(respond=respond)
+    agents = Generator(chat_model=chat_model), Evaluator(chat_model=chat_model), Parser(chat_model=chat_model)
+    parsed_data = {'Prior_Knowledge': 'We have 2 and 3.', 'Question': 'What is 2 + 3?', 'Domain': 'math'}
+    path = str(tmp_path / 'events.jsonl')
+    stream = GraphEventStream(path)
+
+    counts = []
+    for _ in range(2):
+        graph_manager = GraphManager('What is 2 + 3?', *agents, node_threshold=0.5, path_threshold=0.7,
+                                     max_width=2, max_depth=3, parsed_data=parsed_data, event_stream=stream)
+        graph_manager.solve('search', iteration_limit=5)
+        counts.append(len(read_events(path)))
+    stream.close()
+
+    assert 0 < counts[0] < counts[1] == 2 * counts[0]
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip('langchain_core')
+pytest.importorskip('transformers')
+
+from Agents.evaluator import Evaluator
+from Agents.fake_llm import FakeLogprobChatModel
+
+INPUTS = dict(input_data='What is 2 + 3?', thought='Thought: add\nAction: 2 + 3\nResult: 5', domain='math',
+              reasoning_states='Step 1:\nInitial State: 2 and 3')
+
+
+def make_evaluator(top_probabilities, **kwargs):
+    chat_model = FakeLogprobChatModel(top_probabilities=top_probabilities, text='Recompute the sum.')
+    return Evaluator(scoring_mode='logprob', chat_model=chat_model, **kwargs), chat_model
+
+
+def test_expected_score_and_confidence_from_top_logprobs():
+    # The non score token is ignored and the digits are renormalized
+    evaluator, _ = make_evaluator({'9': 0.6, '0': 0.2, 'yes': 0.2})
+
+    result = evaluator.evaluate_with_logprobs(**INPUTS, threshold=0.5)
+
+    assert result['Final Score'] == pytest.approx(75.0)
+    assert result['Confidence'] == pytest.approx(0.75)
+
+
+def test_hint_only_below_the_node_threshold():
+    evaluator, chat_model = make_evaluator({'6': 1.0})
+
+    # 6/9 is above a 0.5 threshold: a single score call and no hint
+    assert evaluator.evaluate_with_logprobs(**INPUTS, threshold=0.5)['Hint'] == ''
+    assert len(chat_model.calls) == 1
+
+    # but below a 0.7 threshold: the hint is generated by a second call
+    assert evaluator.evaluate_with_logprobs(**INPUTS, threshold=0.7)['Hint'] == 'Recompute the sum.'
+    assert len(chat_model.calls) == 3
+
+
+def test_own_hint_threshold_overrides_the_node_threshold():
+    evaluator, _ = make_evaluator({'6': 1.0}, hint_threshold=0.5)
+
+    assert evaluator.evaluate_with_logprobs(**INPUTS, threshold=0.7)['Hint'] == ''
+
+
+def test_cascade_escalates_around_the_threshold_of_each_call():
+    from Agents.cascade import CascadeEvaluator
+
+    small, small_model = make_evaluator({'6': 1.0}, hint_threshold=0.0)
+    large, large_model = make_evaluator({'9': 1.0}, hint_threshold=0.0)
+    cascade = CascadeEvaluator(small, large)
+
+    # 6/9 is far from a 0.3 threshold but within the margin of a 0.7 threshold
+    assert cascade.evaluate_with_logprobs(**INPUTS, threshold=0.3)['Final Score'] == pytest.approx(600 / 9)
+    assert cascade.evaluate_with_logprobs(**INPUTS, threshold=0.7)['Final Score'] == pytest.approx(100.0)
+    assert (len(small_model.calls), len(large_model.calls)) == (2, 1)
+    assert cascade.threshold is None
@@ -0,0 +1,77 @@
+import math
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('langchain')
+pytest.importorskip('transformers')
+
+from Agents.evaluator import PATH_AGGREGATORS
+from Graph.node import Node
+from Graph.path_index import PathScoreIndex
+
+# The path scores recomputed from the node scores of the path root -> node, root excluded
+REFERENCE_AGGREGATORS = {
+    # The former Evaluator.evaluate_path
+    'mean': lambda scores: sum(scores) / len(scores),
+    'min': min,
+    'geometric_mean': lambda scores: math.prod(scores) ** (1 / len(scores)),
+}
+
+
+def attach(parent, score):
+    node = Node(score=score)
+    node.add_parent(parent)
+    parent.add_child(node)
+    return node
+
+
+def build_tree():
+    """
+    root -> a (0.8) -> b (0.4)
+                    -> c (0.9) -> e (0.7)
+         -> d (0.5)
+    """
+    root = Node()
+    a = attach(root, 0.8)
+    b = attach(a, 0.4)
+    c = attach(a, 0.9)
+    d = attach(root, 0.5)
+    e = attach(c, 0.7)
+    return root, [a, b, c, d, e]
+
+
+def path_node_scores(node):
+    scores = []
+    while node.parent is not None:
+        scores.append(node.score)
+        node = node.parent
+    return scores[::-1]
+
+
+@pytest.mark.parametrize('name', sorted(REFERENCE_AGGREGATORS))
+def test_incremental_aggregates_match_the_path_scores(name):
+    _, nodes = build_tree()
+
+    for node in nodes:
+        assert PATH_AGGREGATORS[name](node) == pytest.approx(REFERENCE_AGGREGATORS[name](path_node_scores(node)))
+
+
+def test_best_is_the_terminal_node_with_the_highest_path_score():
+    _, nodes = build_tree()
+    a, b, c, d, e = nodes
+
+    # A small capacity makes the index grow
+    index = PathScoreIndex(capacity=2)
+    for node in nodes:
+        index.add(node, PATH_AGGREGATORS['mean'](node))
+
+    # c has the highest mean but it is no longer terminal once e is attached
+    best, score = index.best()
+    assert (best, score) == (e, pytest.approx(0.8))
+    assert len(index) == 5
+
+    index.remove({c.id, e.id})
+    assert index.best() == (b, pytest.approx(0.6))
+    assert len(index) == 3
+    assert PathScoreIndex().best() == (None, None)
@@ -0,0 +1,118 @@
+import math
+from queue import PriorityQueue
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('networkx')
+pytest.importorskip('langchain')
+pytest.importorskip('transformers')
+
+from Agents.evaluator import Evaluator
+from Agents.fake_llm import ScriptedChatModel
+from Agents.generator import Generator
+from Agents.parser import Parser
+from Graph.graph_manager import GraphManager
+from Graph.node import Node
+
+PARSED_DATA = {'Prior_Knowledge': 'We have 2 and 3.', 'Question': 'What is 2 + 3?', 'Domain': 'math'}
+
+
+def make_evaluator(path_aggregator):
+    return Evaluator(path_aggregator=path_aggregator, chat_model=ScriptedChatModel(respond=lambda prompt: ''))
+
+
+def make_graph_manager(path_aggregator='min', max_width=2):
+    chat_model = ScriptedChatModel(respond=lambda prompt: '')
+    return GraphManager('What is 2 + 3?', Generator(chat_model=chat_model), make_evaluator(path_aggregator),
+                        Parser(chat_model=chat_model), node_threshold=0.3, path_threshold=1.0, max_width=max_width,
+                        max_depth=5, parsed_data=PARSED_DATA)
+
+
+def attach(graph_manager, parent, score, is_leaf=False):
+    node = Node(thought=f'thought {score}', action='action', result='result')
+    assert graph_manager.attach_child(parent, node, [{'Final Score': str(round(score * 100)), 'Hint': ''}])
+    node.is_leaf = is_leaf
+    return node
+
+
+def build_tree(graph_manager):
+    """
+    root -> a (0.9) -> b (0.9, leaf)
+         -> p (0.95) -> q (0.5, leaf)
+    """
+    root = graph_manager.root_node
+    a = attach(graph_manager, root, 0.9)
+    b = attach(graph_manager, a, 0.9, is_leaf=True)
+    p = attach(graph_manager, root, 0.95)
+    q = attach(graph_manager, p, 0.5, is_leaf=True)
+    return a, b, p, q
+
+
+def prune(graph_manager):
+    node_queue = PriorityQueue()
+    for node_id in graph_manager.graph_dict:
+        node_queue.put((0, node_id))
+    graph_manager.prune(node_queue, set())
+    return node_queue
+
+
+def test_pruning_keeps_the_best_path_and_the_index_in_sync():
+    graph_manager = make_graph_manager()
+    a, b, p, q = build_tree(graph_manager)
+    assert graph_manager.path_index.best() == (b, pytest.approx(0.9))
+
+    node_queue = prune(graph_manager)
+
+    # Under the min aggregator, no extension of the path through q can reach 0.9
+    assert set(graph_manager.graph_dict) == {graph_manager.root_node.id, a.id, b.id, p.id}
+    assert set(graph_manager.path_index.positions) == set(graph_manager.graph_dict) - {graph_manager.root_node.id}
+    assert {node_id for _, node_id in node_queue.queue} == set(graph_manager.graph_dict)
+    assert q.id not in graph_manager.graph.graph.nodes
+
+
+def test_a_parent_left_without_children_ends_a_path_again():
+    graph_manager = make_graph_manager()
+    a, b, p, q = build_tree(graph_manager)
+
+    prune(graph_manager)
+
+    assert p.children == []
+    assert graph_manager.path_index.best() == (p, pytest.approx(0.95))
+    assert graph_manager.select_best_solution() == [graph_manager.root_node, p]
+
+
+def test_pruned_children_count_towards_the_width():
+    graph_manager = make_graph_manager(max_width=2)
+    a, b, p, q = build_tree(graph_manager)
+
+    prune(graph_manager)
+    assert p.children == [] and p.width == 1
+
+    # A single attached child reaches the maximum width together with the pruned one
+    attach(graph_manager, p, 0.95)
+    assert len(p.children) == 1
+    assert not graph_manager.is_expandable(p)
+
+
+@pytest.mark.parametrize('path_aggregator, bound', [
+    ('min', 0.4),
+    ('mean', 1.0),
+    ('geometric_mean', 1.0),
+    ('sum', math.inf),
+    (lambda node: node.path_sum, math.inf),
+])
+def test_extension_bounds(path_aggregator, bound):
+    evaluator = make_evaluator(path_aggregator)
+    root, child = Node(), Node(score=0.8)
+    child.add_parent(root)
+    node = Node(score=0.4)
+    node.add_parent(child)
+
+    assert evaluator.score_extension_bound(node) == pytest.approx(bound)
+    assert evaluator.score_extension_bound(root) == math.inf
+    # The bound holds for the path itself and for its best extension with a perfect score
+    extension = Node(score=1.0)
+    extension.add_parent(node)
+    assert evaluator.score_node_path(node) <= bound
+    assert evaluator.score_node_path(extension) <= bound
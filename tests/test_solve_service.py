@@ -0,0 +1,42 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('networkx')
+pytest.importorskip('langchain')
+pytest.importorskip('transformers')
+
+from Agents.fake_llm import ScriptedChatModel
+from Service.solve_service import SolveService
+
+
+def respond(prompt):
+    if 'Parse this input' in prompt:
+        return 'Prior_Knowledge: We have 2 and 3.\nQuestion: What is 2 + 3?\nDomain: math'
+    if 'Evaluate this step' in prompt:
+        return "'Final Score': 80\n'Hint': none"
+    if 'synthesize' in prompt:
+        return 'The answer is 5.'
+    return 'Thought: add the numbers\nAction: 2 + 3\nResult: 5'
+
+
+def test_invalid_jobs_are_reported_without_stopping_the_service():
+    output = io.StringIO()
+    service = SolveService({'chat_model': ScriptedChatModel(respond=respond)}, workers=2, output=output)
+    lines = io.StringIO('\n'.join([
+        '[1, 2]',
+        '{"id": 1}',
+        '{"id": 2, "prompt": "What is 2 + 3?", "config": 5}',
+        'not json',
+        '{"id": 3, "prompt": "What is 2 + 3?"}',
+    ]) + '\n')
+
+    asyncio.run(service.serve(lines))
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [result['status'] for result in results] == ['error'] * 4 + ['done']
+    assert [result.get('id') for result in results] == [None, 1, 2, None, 3]
+    assert results[-1]['answer'] == 'The answer is 5.'
@@ -0,0 +1,47 @@
+import itertools
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('networkx')
+pytest.importorskip('langchain')
+pytest.importorskip('transformers')
+
+from Agents.evaluator import Evaluator
+from Agents.fake_llm import ScriptedChatModel
+from Agents.generator import Generator
+from Agents.parser import Parser
+from Graph.graph_manager import GraphManager
+
+PARSED_DATA = {'Prior_Knowledge': 'We have 2 and 3.', 'Question': 'What is 2 + 3?', 'Domain': 'math'}
+
+
+def make_agents():
+    thought_ids = itertools.count()
+
+    def generate(prompt):
+        if 'synthesize' in prompt:
+            return 'The answer is 5.'
+        # A chain of two new thoughts per call
+        return '\n\n'.join(f'Thought: thought {n}\nAction: action {n}\nResult: result {n}'
+                           for n in (next(thought_ids), next(thought_ids)))
+
+    generator = Generator(chat_model=ScriptedChatModel(respond=generate))
+    evaluator = Evaluator(chat_model=ScriptedChatModel(respond=lambda prompt: "'Final Score': 80\n'Hint': none"))
+    parser = Parser(chat_model=ScriptedChatModel(respond=lambda prompt: ''))
+    return generator, evaluator, parser
+
+
+@pytest.mark.parametrize('down_up', [True, False])
+def test_speculations_are_used_by_the_next_expansions(down_up):
+    generator, evaluator, parser = make_agents()
+    # No path reaches the path threshold, so the search runs all its iterations
+    graph_manager = GraphManager('What is 2 + 3?', generator, evaluator, parser, node_threshold=0.5,
+                                 path_threshold=0.9, max_width=2, max_depth=4, speculative_width=1,
+                                 parsed_data=PARSED_DATA)
+
+    assert graph_manager.solve('search', iteration_limit=12, down_up=down_up) == 'The answer is 5.'
+
+    stats = graph_manager.speculator.stats()
+    assert stats['hits'] > 0
+    assert stats['wasted_tokens'] < stats['spent_tokens']
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('networkx')
+pytest.importorskip('langchain')
+pytest.importorskip('transformers')
+
+from Agents.evaluator import Evaluator
+from Agents.fake_llm import ScriptedChatModel
+from Agents.generation_policy import GenerationPolicy
+from Agents.generator import Generator
+from Agents.parser import Parser
+from Graph.graph_manager import GraphManager
+
+PARSED_DATA = {'Prior_Knowledge': 'We have 2 and 3.', 'Question': 'What is 2 + 3?', 'Domain': 'math'}
+
+
+def respond(prompt):
+    if 'Evaluate this step' in prompt:
+        return "'Final Score': 80\n'Hint': none"
+    if 'synthesize' in prompt:
+        return 'The answer is 5.'
+    return 'Thought: add the numbers\nAction: 2 + 3\nResult: 5'
+
+
+def make_agents(generator_budget=None, parser_budget=None):
+    chat_model = ScriptedChatModel(respond=respond)
+    generator = Generator(chat_model=chat_model, generation_policy=GenerationPolicy(token_budget=generator_budget))
+    parser = Parser(chat_model=chat_model, generation_policy=GenerationPolicy(token_budget=parser_budget))
+    return generator, Evaluator(chat_model=chat_model), parser
+
+
+def test_solve_answers_from_the_best_path_once_the_budget_is_spent():
+    generator, evaluator, parser = make_agents()
+    generator.generation_policy.token_budget = 1
+    graph_manager = GraphManager('What is 2 + 3?', generator, evaluator, parser, node_threshold=0.5,
+                                 path_threshold=0.9, max_width=3, max_depth=5, parsed_data=PARSED_DATA)
+
+    # The root expansion fits in the budget, the next expansion stops the search
+    assert graph_manager.solve('search', iteration_limit=20) == 'The answer is 5.'
+    assert len(graph_manager.final_answer) == 2
+    assert len(graph_manager.graph_dict) == 2
+
+
+def test_solve_answers_when_the_budget_is_spent_before_the_search():
+    generator, evaluator, parser = make_agents(generator_budget=10, parser_budget=10)
+    generator.tokens_count = parser.tokens_count = 10
+
+    graph_manager = GraphManager('What is 2 + 3?', generator, evaluator, parser, node_threshold=0.5,
+                                 path_threshold=0.9, max_width=3, max_depth=5)
+    assert graph_manager.parsed_data['Question'] == 'What is 2 + 3?'
+
+    assert graph_manager.solve('search', iteration_limit=20) == 'The answer is 5.'
+    assert graph_manager.final_answer == [graph_manager.root_node]
+
+
+def test_asolve_answers_once_the_budget_is_spent():
+    generator, evaluator, parser = make_agents(generator_budget=10, parser_budget=10)
+    generator.tokens_count = parser.tokens_count = 10
+
+    async def solve():
+        graph_manager = await GraphManager.acreate('What is 2 + 3?', generator, evaluator, parser,
+                                                   node_threshold=0.5, path_threshold=0.9, max_width=3, max_depth=5)
+        return await graph_manager.asolve('search', iteration_limit=20)
+
+    assert asyncio.run(solve()) == 'The answer is 5.'